@@ -2,6 +2,7 @@ from fastapi import FastAPI, APIRouter, Form, Body, Request, UploadFile, File
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse
 import os
 import importlib.util
 import logging
@@ -72,6 +73,75 @@ app.mount("/uploads", StaticFiles(directory=uploads_path), name="uploads")
 # 프론트엔드 URL 설정
 frontend_url = os.getenv("FRONTEND_URL", "https://vocal-alchemy-mixer.lovable.app")
 
+# 업로드 경로는 본문 크기를 세면서 받아 제한을 넘는 즉시 중단
+# (Content-Length 가 없는 chunked 업로드도 multipart 파서가 디스크에 쌓기 전에 차단)
+UPLOAD_PATHS = ("/upload/file", "/train/upload-voice")
+UPLOAD_FORM_OVERHEAD = 64 * 1024  # multipart 경계/헤더 여유분
+
+class _UploadTooLarge(Exception):
+    pass
+
+class UploadSizeLimitMiddleware:
+    """업로드 요청 본문 크기를 제한하는 ASGI 미들웨어
+
+    Content-Length 가 제한을 넘으면 본문을 받기 전에 413을 반환하고, 헤더가 없거나
+    실제 본문이 더 길면 receive 를 감싸 누적 바이트를 세다가 제한을 넘는 순간 수신을 중단합니다.
+    이때 라우트가 보내려던 응답(본문 파싱 오류 등)은 버리고 413으로 대신 응답합니다.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in UPLOAD_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        from app.services.ingest import UPLOAD_MAX_BYTES
+        limit = UPLOAD_MAX_BYTES + UPLOAD_FORM_OVERHEAD
+        content_length = dict(scope["headers"]).get(b"content-length", b"").decode("latin-1")
+        if content_length.isdigit() and int(content_length) > limit:
+            logger.warning(f"업로드 크기 제한 초과로 거부: {scope['path']} ({content_length} bytes)")
+            await self._reject(scope, receive, send, UPLOAD_MAX_BYTES)
+            return
+
+        received = 0
+        exceeded = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    exceeded = True
+                    raise _UploadTooLarge()
+            return message
+
+        async def guarded_send(message):
+            # 제한을 넘은 뒤 라우트가 보내는 응답은 버림
+            if not exceeded:
+                await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except _UploadTooLarge:
+            pass
+        if exceeded:
+            logger.warning(f"업로드 본문이 제한을 넘어 수신 중단: {scope['path']} ({received} bytes 이상)")
+            await self._reject(scope, receive, send, UPLOAD_MAX_BYTES)
+
+    async def _reject(self, scope, receive, send, max_bytes: int):
+        response = JSONResponse(
+            status_code=413,
+            content={"detail": f"파일 크기가 제한({max_bytes // (1024 * 1024)}MB)을 초과했습니다"},
+            headers={"Connection": "close"}
+        )
+        await response(scope, receive, send)
+
+# CORS 보다 먼저 등록해 안쪽에 두어야 413 응답에도 CORS 헤더가 붙음 (나중에 등록한 미들웨어가 바깥쪽)
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # CORS 설정
 app.add_middleware(
     CORSMiddleware,
@@ -88,6 +158,27 @@ app.add_middleware(
     allow_headers=["*"],  # 모든 헤더 허용
 )
 
+# 서버 시작 시 demucs 모델을 미리 로드해 첫 분리 요청의 대기 시간을 없앰
+@app.on_event("startup")
+async def preload_models():
+    if os.getenv("DEMUCS_PRELOAD", "1") == "1":
+        from app.services.separation_engine import get_separation_engine
+        get_separation_engine().warmup()
+
+# 서버 시작 시 참조가 모두 사라진 업로드 blob 정리
+@app.on_event("startup")
+async def collect_blob_garbage():
+    import asyncio
+    from app.services.blob_store import get_blob_store
+    asyncio.get_running_loop().run_in_executor(None, get_blob_store().collect_garbage)
+
+# 새 샘플이 쌓인 사용자의 모델을 자동으로 재학습하는 스케줄러 시작
+@app.on_event("startup")
+async def start_retrain_scheduler():
+    if os.getenv("AUTO_RETRAIN", "1") == "1":
+        from app.services.retrain_scheduler import get_retrain_scheduler
+        get_retrain_scheduler().start()
+
 # 기본 라우트
 @app.get("/")
 async def root():
@@ -96,6 +187,7 @@ async def root():
 # URL 요청 모델 정의
 class URLRequest(BaseModel):
     url: str
+    audio_format: str | None = None  # "mp3"(기본) 또는 "native"(원본 스트림, 분리용)
 
 # YouTube 다운로드 엔드포인트 직접 구현 - 여러 입력 형식 지원
 @app.post("/upload/url")
@@ -103,6 +195,7 @@ async def upload_url(
     request: Request,
     url_data: URLRequest = Body(None),
     url: str = Form(None),
+    audio_format: str = Form(None),
     cookies: UploadFile | None = File(None)
 ):
     try:
@@ -161,42 +254,16 @@ async def upload_url(
             logger.error("URL을 찾을 수 없습니다")
             return {"error": "URL을 제공해주세요. 지원하는 형식: JSON 본문, 폼 데이터, 쿼리 파라미터"}
             
-        # 로그 출력
-        logger.info(f"URL 다운로드 요청: {final_url}")
-        
-        import yt_dlp
-        import uuid
+        # 다운로드 형식 (JSON 본문 → 폼 → 쿼리 파라미터 순)
+        if url_data and url_data.audio_format:
+            audio_format = url_data.audio_format
+        audio_format = audio_format or request.query_params.get("audio_format")
         
-        # 다운로드 디렉토리 생성
-        download_dir = "downloads"
-        os.makedirs(download_dir, exist_ok=True)
-        
-        # 고유한 파일명 생성
-        file_id = str(uuid.uuid4())
-        output_template = os.path.join(download_dir, f"{file_id}.%(ext)s")
-        
-        # YouTube API 키 가져오기
-        youtube_api_key = os.getenv("YOUTUBE_API_KEY", "")
-        
-        # 다운로드 옵션 설정
-        ydl_opts = {
-            'format': 'bestaudio/best',
-            'outtmpl': output_template,
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '192',
-            }],
-            'quiet': False,
-            'verbose': True,
-        }
+        # 로그 출력
+        logger.info(f"URL 다운로드 요청: {final_url} (형식: {audio_format or '기본'})")
         
-        # API 키 설정
-        if youtube_api_key:
-            ydl_opts['ap_mso'] = youtube_api_key
-            logger.info("YouTube API 키가 설정되었습니다.")
-        else:
-            logger.warning("YouTube API 키가 설정되지 않았습니다.")
+        from app.services.job_queue import get_job_queue
+        from app.services.downloader import download_audio_from_url
         
         # 쿠키 파일 처리 (옵션)
         cookie_tmp = None
@@ -205,18 +272,28 @@ async def upload_url(
                 cookie_tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".txt")
                 shutil.copyfileobj(cookies.file, cookie_tmp)
                 cookie_tmp.close()
-                ydl_opts['cookiefile'] = cookie_tmp.name
                 logger.info(f"쿠키 파일 적용: {cookie_tmp.name}")
             except Exception as e:
                 logger.error(f"쿠키 파일 처리 오류: {e}")
+                cookie_tmp = None
         
-        # 다운로드 실행
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            logger.info(f"다운로드 시작: {final_url}")
-            ydl.download([final_url])
+        # 작업 큐의 다운로드 워커에서 실행 (같은 영상은 캐시 재사용, 동시 요청은 하나의 다운로드로 합침)
+        try:
+            output_path = await get_job_queue().run(
+                "download", download_audio_from_url, final_url, cookie_tmp.name if cookie_tmp else None, audio_format
+            )
+        finally:
+            # 쿠키 임시 파일 삭제
+            if cookie_tmp:
+                try:
+                    os.remove(cookie_tmp.name)
+                except Exception:
+                    pass
         
-        # 결과 파일 경로
-        output_path = os.path.join(download_dir, f"{file_id}.mp3")
+        # 결과 파일 이름 (/files 경로로 제공)
+        file_name = os.path.basename(output_path)
+        # 원본 스트림(opus/m4a)은 재생 요청 시에만 MP3로 변환해 제공
+        file_url = f"/files/{file_name}" if file_name.endswith(".mp3") else f"/upload/playable/{file_name}"
         
         if os.path.exists(output_path):
             logger.info(f"다운로드 성공: {output_path}")
@@ -224,7 +301,7 @@ async def upload_url(
             # 데이터베이스에 파일 정보 저장
             try:
                 # 임시로 Supabase 코드 비활성화
-                logger.info(f"파일 URL: /files/{file_id}.mp3")
+                logger.info(f"파일 URL: {file_url}")
                 logger.info("데이터베이스 저장 기능 임시 비활성화")
                 
                 """
@@ -252,11 +329,11 @@ async def upload_url(
                     # 데이터베이스에 저장
                     data = {
                         "user_id": user_id,
-                        "title": f"다운로드된 오디오 {file_id}",
-                        "file_url": f"/files/{file_id}.mp3",  # 웹에서 접근 가능한 URL로 수정
+                        "title": f"다운로드된 오디오 {file_name}",
+                        "file_url": f"/files/{file_name}",  # 웹에서 접근 가능한 URL로 수정
                         "file_type": "original",
                         "upload_source": "url",
-                        "original_filename": f"{file_id}.mp3",
+                        "original_filename": file_name,
                         "file_size": file_size,
                         "duration": duration
                     }
@@ -269,14 +346,7 @@ async def upload_url(
             except Exception as e:
                 logger.error(f"데이터베이스 저장 중 오류 발생: {str(e)}")
             
-            # 쿠키 임시 파일 삭제
-            if cookie_tmp:
-                try:
-                    os.remove(cookie_tmp.name)
-                except Exception:
-                    pass
-            
-            return {"message": "다운로드 성공", "file_path": output_path, "file_url": f"/files/{file_id}.mp3"}
+            return {"message": "다운로드 성공", "file_path": output_path, "file_url": file_url}
         else:
             logger.error("다운로드된 파일을 찾을 수 없습니다")
             return {"error": "다운로드된 파일을 찾을 수 없습니다"}
@@ -317,9 +387,11 @@ if routers_dir and routers_dir.exists():
         {"file": "upload.py", "prefix": "/upload"},
         {"file": "convert.py", "prefix": "/convert"},
         {"file": "split.py", "prefix": "/audio"},
+        {"file": "mix.py", "prefix": "/audio"},
         {"file": "convert_svc.py", "prefix": "/svc"},
         {"file": "train.py", "prefix": "/train"},
-        {"file": "lovable_proxy.py", "prefix": "/lovable"}
+        {"file": "lovable_proxy.py", "prefix": "/lovable"},
+        {"file": "jobs.py", "prefix": "/jobs"}
     ]
 
     for config in router_config:
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Form, Depends
 from pydantic import BaseModel
-from app.services.svc import convert_vocals_with_svc
+from app.services.svc import convert_vocals_for_api
+from app.services.job_queue import get_job_queue
 from app.utils import get_current_user
 import os
 
@@ -9,6 +10,8 @@ router = APIRouter()
 class ConvertResponse(BaseModel):
     message: str
     output_path: str
+    # 믹싱 등 내부 처리에 그대로 넘길 수 있는 스템(.f32stem) 경로
+    output_stem_path: str = ""
 
 @router.post("/voice-convert", response_model=ConvertResponse)
 async def voice_convert(
@@ -19,10 +22,12 @@ async def voice_convert(
         return {"message": "입력 파일 없음", "output_path": ""}
 
     try:
-        converted = convert_vocals_with_svc(path, user_id)
+        # 작업 큐의 변환 워커에서 실행해 이벤트 루프를 막지 않음
+        converted = await get_job_queue().run("convert", convert_vocals_for_api, path, user_id, user_id=user_id)
         return {
             "message": "변환 성공",
-            "output_path": converted
+            "output_path": converted["output_path"],
+            "output_stem_path": converted["output_stem_path"]
         }
     except Exception as e:
         return {"message": f"에러: {str(e)}", "output_path": ""}
\ No newline at end of file
@@ -0,0 +1,171 @@
+from fastapi import APIRouter, Form, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+from typing import Optional
+from app.services.job_queue import get_job_queue
+from app.services.progress import ProgressCallback, get_progress_broker
+from app.services.downloader import download_audio_from_url
+from app.services.splitter import separate_audio_for_api
+from app.services.svc import convert_vocals_for_api
+from app.services.trainer import train_user_voice
+from app.services.cover_pipeline import create_cover
+from app.services.mixer import OUTPUT_FORMATS
+from app.utils import get_current_user
+import os
+import json
+import asyncio
+
+router = APIRouter()
+
+# 이벤트가 없을 때 연결 유지를 위해 보내는 주석 간격 (초)
+SSE_KEEPALIVE_SECONDS = 15
+
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    stage: str
+    status: str
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    stage: str
+    status: str
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    progress: Optional[dict] = None
+
+def _submitted(job) -> dict:
+    return {"job_id": job.id, "stage": job.stage, "status": job.status}
+
+def _get_job_or_404(job_id: str):
+    job = get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다")
+    return job
+
+# URL 오디오 다운로드 작업 제출
+@router.post("/download", response_model=JobSubmitResponse)
+async def submit_download(url: str = Form(...), audio_format: Optional[str] = Form(None)):
+    job = get_job_queue().submit("download", download_audio_from_url, url, audio_format=audio_format)
+    return _submitted(job)
+
+# 보컬/반주 분리 작업 제출
+@router.post("/split", response_model=JobSubmitResponse)
+async def submit_split(path: str = Form(...)):
+    if not os.path.exists(path):
+        raise HTTPException(status_code=400, detail="파일이 존재하지 않음")
+
+    job = get_job_queue().submit("split", separate_audio_for_api, path)
+    return _submitted(job)
+
+# 음성 변환 작업 제출
+@router.post("/convert", response_model=JobSubmitResponse)
+async def submit_convert(
+    path: str = Form(...),
+    user_id: str = Depends(get_current_user)
+):
+    if not os.path.exists(path):
+        raise HTTPException(status_code=400, detail="입력 파일 없음")
+
+    job = get_job_queue().submit("convert", _convert_to_wav, path, user_id, user_id=user_id)
+    return _submitted(job)
+
+def _convert_to_wav(path: str, user_id: str, progress: Optional[ProgressCallback] = None) -> str:
+    # 변환 작업 결과는 이전과 같이 WAV 경로 문자열로 유지
+    return convert_vocals_for_api(path, user_id, progress)["output_path"]
+
+# 모델 학습 작업 제출
+@router.post("/train", response_model=JobSubmitResponse)
+async def submit_train(user_id: str = Form(...)):
+    job = get_job_queue().submit("train", train_user_voice, user_id, user_id=user_id)
+    return _submitted(job)
+
+# 커버 생성 파이프라인 작업 제출 (URL 또는 서버에 있는 파일 경로 중 하나)
+@router.post("/cover", response_model=JobSubmitResponse)
+async def submit_cover(
+    url: Optional[str] = Form(None),
+    path: Optional[str] = Form(None),
+    transpose: int = Form(0),
+    output_format: str = Form("mp3"),
+    vocals_gain_db: float = Form(0.0),
+    instrumental_gain_db: float = Form(0.0),
+    vocals_pan: float = Form(0.0),
+    instrumental_pan: float = Form(0.0),
+    user_id: str = Depends(get_current_user)
+):
+    if (url is None) == (path is None):
+        raise HTTPException(status_code=400, detail="url 과 path 중 하나만 지정해야 합니다")
+    if path is not None and not os.path.exists(path):
+        raise HTTPException(status_code=400, detail="입력 파일 없음")
+    if output_format not in OUTPUT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"지원하지 않는 출력 형식입니다: {output_format}")
+
+    job = get_job_queue().submit(
+        "cover", create_cover, user_id,
+        url=url,
+        input_path=path,
+        transpose=transpose,
+        output_format=output_format,
+        vocals_gain_db=vocals_gain_db,
+        instrumental_gain_db=instrumental_gain_db,
+        vocals_pan=vocals_pan,
+        instrumental_pan=instrumental_pan,
+        user_id=user_id
+    )
+    return _submitted(job)
+
+# 작업 상태 조회
+@router.get("/{job_id}", response_model=JobStatusResponse)
+async def get_job_status(job_id: str):
+    return _get_job_or_404(job_id).to_dict()
+
+# 작업 진행 이벤트 스트림 (Server-Sent Events)
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request):
+    job = _get_job_or_404(job_id)
+    broker = get_progress_broker()
+    queue, history = broker.subscribe(job.id)
+
+    async def event_stream():
+        try:
+            # 연결 전에 발생한 이벤트부터 전달
+            for event in history:
+                yield _sse(event)
+            if job.finished:
+                yield _sse({"event": "status", "status": job.status, "error": job.error})
+                return
+
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+
+                yield _sse(event)
+                if event["event"] == "status" and event["status"] in ("done", "failed"):
+                    return
+        finally:
+            broker.unsubscribe(job.id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _sse(event: dict) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+# 작업 결과 조회 (완료 전이면 202 반환)
+@router.get("/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = _get_job_or_404(job_id)
+
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=f"작업 실패: {job.error}")
+    if job.status != "done":
+        return JSONResponse(status_code=202, content=job.to_dict())
+
+    return {**job.to_dict(), "result": job.result}
@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Form, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from app.services.mixer import mix_vocals_and_instrumental, cover_stems, iter_mix_and_save, OUTPUT_FORMATS
+from app.services.job_queue import get_job_queue
+import os
+
+router = APIRouter()
+
+class MixResponse(BaseModel):
+    message: str
+    output_path: str
+
+@router.post("/mix", response_model=MixResponse)
+async def mix_audio(
+    vocals_path: str = Form(...),
+    instrumental_path: str = Form(...),
+    vocals_gain_db: float = Form(0.0),
+    instrumental_gain_db: float = Form(0.0),
+    vocals_pan: float = Form(0.0),
+    instrumental_pan: float = Form(0.0)
+):
+    if not os.path.exists(vocals_path) or not os.path.exists(instrumental_path):
+        return {"message": "파일 경로가 유효하지 않음", "output_path": ""}
+
+    # 작업 큐의 믹싱 워커에서 실행해 이벤트 루프를 막지 않음
+    output_path = await get_job_queue().run(
+        "mix", mix_vocals_and_instrumental,
+        vocals_path, instrumental_path,
+        vocals_gain_db=vocals_gain_db,
+        instrumental_gain_db=instrumental_gain_db,
+        vocals_pan=vocals_pan,
+        instrumental_pan=instrumental_pan
+    )
+    return {
+        "message": "믹싱 성공",
+        "output_path": output_path
+    }
+
+# 믹싱과 인코딩을 블록 단위로 진행하며 결과를 바로 전송 (끝나기 전에 재생/다운로드 시작 가능)
+@router.post("/mix/stream")
+async def mix_audio_stream(
+    vocals_path: str = Form(...),
+    instrumental_path: str = Form(...),
+    vocals_gain_db: float = Form(0.0),
+    instrumental_gain_db: float = Form(0.0),
+    vocals_pan: float = Form(0.0),
+    instrumental_pan: float = Form(0.0),
+    output_format: str = Form("mp3")
+):
+    if not os.path.exists(vocals_path) or not os.path.exists(instrumental_path):
+        raise HTTPException(status_code=400, detail="파일 경로가 유효하지 않음")
+    if output_format not in OUTPUT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"지원하지 않는 출력 형식입니다: {output_format}")
+
+    stems = cover_stems(vocals_path, instrumental_path, vocals_gain_db, instrumental_gain_db, vocals_pan, instrumental_pan)
+    # 저장 파일은 응답을 끝까지 소비해야 만들어지므로 경로를 헤더로 알리지 않음 (경로가 필요하면 /mix 사용)
+    _, chunks = iter_mix_and_save(stems, output_format)
+    # 믹싱/인코딩은 믹싱 워커 하나를 응답이 끝날 때까지 점유한 채 진행해 /mix 와 같은 동시 실행 제한을 받고,
+    # 동기 이터레이터는 스레드풀에서 소비되므로 이벤트 루프를 막지 않음
+    return StreamingResponse(
+        get_job_queue().iter_in_stage("mix", chunks),
+        media_type=OUTPUT_FORMATS[output_format]["media_type"]
+    )
\ No newline at end of file
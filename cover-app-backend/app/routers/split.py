@@ -1,7 +1,12 @@
-from fastapi import APIRouter, Form
+from fastapi import APIRouter, Form, HTTPException
+from fastapi.responses import FileResponse
 from pydantic import BaseModel
-from app.services.splitter import separate_audio
+from starlette.background import BackgroundTask
+from app.services.splitter import separate_audio_for_api
+from app.services.job_queue import get_job_queue
+from app.utils.stem_format import is_stem, export_stem, EXPORT_FORMATS
 import os
+import tempfile
 
 router = APIRouter()
 
@@ -9,15 +14,45 @@ class SplitResponse(BaseModel):
     message: str
     vocals_path: str
     accompaniment_path: str
+    # 믹싱 등 내부 처리에 그대로 넘길 수 있는 스템(.f32stem) 경로
+    vocals_stem_path: str = ""
+    accompaniment_stem_path: str = ""
 
 @router.post("/split", response_model=SplitResponse)
 async def split_audio(path: str = Form(...)):
     if not os.path.exists(path):
         return {"message": "파일이 존재하지 않음", "vocals_path": "", "accompaniment_path": ""}
 
-    result = separate_audio(path)
+    # 작업 큐의 분리 워커에서 실행해 이벤트 루프를 막지 않음
+    result = await get_job_queue().run("split", separate_audio_for_api, path)
     return {
         "message": "보컬/반주 분리 성공",
         "vocals_path": result["vocals"],
-        "accompaniment_path": result["accompaniment"]
-    }
\ No newline at end of file
+        "accompaniment_path": result["accompaniment"],
+        "vocals_stem_path": result["vocals_stem"],
+        "accompaniment_stem_path": result["accompaniment_stem"]
+    }
+
+# 내부 스템(.f32stem)을 WAV/MP3 로 내보내 다운로드 (중간 결과는 이 경계에서만 인코딩)
+@router.post("/export")
+async def export_audio(path: str = Form(...), output_format: str = Form("wav")):
+    if not os.path.exists(path) or not is_stem(path):
+        raise HTTPException(status_code=400, detail="스템 파일이 존재하지 않음")
+    if output_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"지원하지 않는 내보내기 형식입니다: {output_format}")
+
+    fd, output_path = tempfile.mkstemp(suffix=f".{output_format}", prefix="export-")
+    os.close(fd)
+    try:
+        await get_job_queue().run("mix", export_stem, path, output_path, output_format)
+    except Exception:
+        os.remove(output_path)
+        raise
+
+    filename = os.path.splitext(os.path.basename(path))[0] + f".{output_format}"
+    return FileResponse(
+        output_path,
+        media_type="audio/mpeg" if output_format == "mp3" else "audio/wav",
+        filename=filename,
+        background=BackgroundTask(os.remove, output_path)
+    )
\ No newline at end of file
@@ -1,7 +1,9 @@
 from fastapi import APIRouter, UploadFile, File, Form
 import os
-import shutil
 from app.services.trainer import train_user_voice
+from app.services.job_queue import get_job_queue
+from app.services.ingest import ingest_upload
+from app.services.retrain_scheduler import get_retrain_scheduler
 
 router = APIRouter()
 
@@ -10,13 +12,16 @@ async def upload_user_voice(user_id: str = Form(...), file: UploadFile = File(..
     save_dir = f"user_data/{user_id}/samples"
     os.makedirs(save_dir, exist_ok=True)
 
-    file_path = os.path.join(save_dir, file.filename)
-    with open(file_path, "wb") as f:
-        shutil.copyfileobj(file.file, f)
+    file_path = os.path.join(save_dir, os.path.basename(file.filename))
+    # 청크 단위로 저장하며 해시 계산, 크기/형식 제한 초과 시 즉시 거부
+    ingested = await ingest_upload(file, file_path)
+    # 새 샘플 수가 기준을 넘으면 자동 재학습 예약
+    get_retrain_scheduler().notify(user_id)
 
-    return {"message": "음성 업로드 완료", "path": file_path}
+    return {"message": "음성 업로드 완료", "path": file_path, "sha256": ingested.sha256, "size": ingested.size}
     
 @router.post("/train")
 async def train_voice(user_id: str = Form(...)):
-    result = train_user_voice(user_id)
+    # 작업 큐의 학습 워커에서 실행해 이벤트 루프를 막지 않음
+    result = await get_job_queue().run("train", train_user_voice, user_id, user_id=user_id)
     return {"message": result}
\ No newline at end of file
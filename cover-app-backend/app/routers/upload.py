@@ -1,11 +1,16 @@
-from fastapi import APIRouter, UploadFile, File, Depends, Header, Request
+from fastapi import APIRouter, UploadFile, File, Depends, Header, Request, HTTPException, Form
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-import shutil
 import os
 from typing import Optional
 from app.utils import get_current_user
 import uuid
 import logging
+from app.services.ingest import ingest_upload
+from app.services.blob_store import get_blob_store
+from app.services.downloader import DOWNLOAD_DIR, ensure_playable_mp3, iter_playlist_downloads
+import json
 
 router = APIRouter()
 
@@ -21,6 +26,8 @@ class UploadResponse(BaseModel):
     filename: str
     path: str
     url: str  # 웹에서 접근 가능한 URL 추가
+    sha256: str  # 업로드 내용 해시 (캐시/중복 제거 키)
+    size: int
 
 @router.post("/file", response_model=UploadResponse)
 async def upload_file(
@@ -45,26 +52,29 @@ async def upload_file(
     # 고유한 파일명 생성
     unique_filename = f"{uuid.uuid4()}{file_ext}"
     
-    # 파일을 uploads 디렉토리에 저장 (웹에서 접근 가능하도록)
-    save_path = os.path.join(UPLOAD_DIR, unique_filename)
+    # 실제 데이터는 blob 저장소에 한 번만 기록 (같은 내용이면 기존 blob 재사용)
+    store = get_blob_store()
     
     try:
-        with open(save_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # 청크 단위로 저장하며 해시 계산, 크기/형식 제한 초과 시 즉시 거부
+        ingested = await ingest_upload(file, store.staging_path())
+        # 해시 확인 후 이동과 SQLite 참조 기록은 쓰기 경합 시 기다릴 수 있으므로 스레드풀에서 실행
+        await run_in_threadpool(store.put, ingested.path, ingested.sha256)
     except Exception as e:
         logger.exception("[Upload] 파일 저장 중 오류")
         raise
     
+    # uploads 디렉토리에 연결 (웹에서 접근 가능하도록)
+    save_path = os.path.join(UPLOAD_DIR, unique_filename)
+    await run_in_threadpool(store.link, ingested.sha256, save_path)
+    
     # 웹에서 접근 가능한 URL 생성
     file_url = f"/uploads/{unique_filename}"
     
-    # 사용자별 디렉토리에도 복사 (선택사항)
+    # 사용자별 디렉토리에도 연결 (복사 없이 같은 blob 참조)
     user_upload_dir = os.path.join("user_data", user_id, "uploads")
-    if not os.path.exists(user_upload_dir):
-        os.makedirs(user_upload_dir)
-    
     user_save_path = os.path.join(user_upload_dir, unique_filename)
-    shutil.copy2(save_path, user_save_path)
+    await run_in_threadpool(store.link, ingested.sha256, user_save_path)
 
     logger.info(f"[Upload] ✔ 저장 완료: {save_path}")
 
@@ -72,5 +82,35 @@ async def upload_file(
         "message": "파일 업로드 및 저장 성공",
         "filename": file.filename,
         "path": save_path,
-        "url": file_url  # 웹에서 접근 가능한 URL 반환
+        "url": file_url,  # 웹에서 접근 가능한 URL 반환
+        "sha256": ingested.sha256,
+        "size": ingested.size
     }
+
+# 원본 스트림으로 받은 다운로드 파일을 재생용 MP3로 제공 (최초 요청 시 한 번만 변환)
+@router.get("/playable/{file_name}")
+async def get_playable(file_name: str):
+    source_path = os.path.join(DOWNLOAD_DIR, os.path.basename(file_name))
+    if not os.path.exists(source_path):
+        raise HTTPException(status_code=404, detail="파일을 찾을 수 없습니다")
+
+    try:
+        mp3_path = await run_in_threadpool(ensure_playable_mp3, source_path)
+    except Exception as e:
+        logger.error(f"재생용 MP3 변환 실패: {source_path}, 에러: {str(e)}")
+        raise HTTPException(status_code=500, detail="재생용 파일을 만들 수 없습니다")
+
+    return FileResponse(mp3_path, media_type="audio/mpeg", filename=os.path.basename(mp3_path))
+
+# 플레이리스트 일괄 다운로드 - 항목이 끝나는 순서대로 NDJSON 한 줄씩 전송
+@router.post("/playlist")
+async def upload_playlist(url: str = Form(...), audio_format: Optional[str] = Form(None)):
+    def stream():
+        try:
+            for event in iter_playlist_downloads(url, audio_format=audio_format):
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        except Exception as e:
+            logger.error(f"플레이리스트 다운로드 실패: {url}, 에러: {str(e)}")
+            yield json.dumps({"event": "error", "error": str(e)}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -0,0 +1,169 @@
+import os
+import stat
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", "blobs")
+REFS_DB_FILENAME = "refs.db"
+# 참조 기록 전에 정리되지 않도록 새로 등록(또는 재사용)된 blob 을 보호하는 시간 (초)
+ORPHAN_GRACE_SECONDS = 3600
+# 다른 프로세스가 쓰기 잠금을 잡고 있을 때 기다리는 최대 시간 (밀리초)
+REFS_DB_BUSY_TIMEOUT_MS = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS refs (
+    view_path TEXT PRIMARY KEY,
+    digest TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_refs_digest ON refs (digest);
+"""
+
+
+class BlobStore:
+    """콘텐츠 해시(SHA-256)로 파일을 한 번만 저장하는 저장소
+
+    실제 데이터는 blobs/<해시 앞 2자리>/<해시> 에 한 번만 기록하고,
+    uploads/ 나 user_data/<id>/uploads/ 같은 공개/사용자 경로는 하드링크
+    (하드링크를 만들 수 없으면 심볼릭 링크)로 연결합니다. 연결된 경로는 SQLite(WAL)
+    refs.db 에 한 행씩 기록하므로 업로드마다 전체 목록을 다시 쓰지 않고, 여러 워커
+    프로세스가 동시에 기록해도 서로의 참조를 덮어쓰지 않습니다.
+
+    참조 추가와 blob 정리는 모두 쓰기 트랜잭션(BEGIN IMMEDIATE) 안에서 이루어지므로
+    정리 중인 blob 에 새 참조가 걸리지 않습니다.
+    """
+
+    def __init__(self, root: str = BLOB_STORE_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        (self.root / ".staging").mkdir(exist_ok=True)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connection().executescript(SCHEMA)
+
+    def staging_path(self) -> str:
+        """blob 과 같은 파일시스템의 임시 저장 경로 (put 전에 여기에 기록)"""
+        return str(self.root / ".staging" / uuid.uuid4().hex)
+
+    def blob_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def put(self, staged_path: str, digest: str) -> Path:
+        """임시 파일을 blob 으로 등록 (이미 같은 내용이 있으면 임시 파일만 삭제)"""
+        blob_path = self.blob_path(digest)
+        with self._lock:
+            if blob_path.exists():
+                os.remove(staged_path)
+                # 참조를 기록하기 전에 정리되지 않도록 수정 시각 갱신
+                os.utime(blob_path, None)
+                logger.info(f"중복 업로드, 기존 blob 재사용: {digest}")
+            else:
+                blob_path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(staged_path, blob_path)
+                # 링크된 경로를 통해 blob 이 수정되지 않도록 읽기 전용으로 설정
+                os.chmod(blob_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        return blob_path
+
+    def link(self, digest: str, view_path: str) -> str:
+        """blob 을 view_path 에 연결하고 참조 기록"""
+        blob_path = self.blob_path(digest)
+        os.makedirs(os.path.dirname(view_path) or ".", exist_ok=True)
+
+        with self._write() as conn:
+            if not blob_path.exists():
+                raise FileNotFoundError(f"blob 이 없습니다: {digest}")
+            try:
+                os.link(blob_path, view_path)
+            except OSError:
+                # 다른 파일시스템이거나 하드링크를 지원하지 않는 경우
+                os.symlink(os.path.abspath(blob_path), view_path)
+            conn.execute("INSERT OR REPLACE INTO refs (view_path, digest) VALUES (?, ?)", (view_path, digest))
+
+        return view_path
+
+    def collect_garbage(self) -> int:
+        """사라진 참조를 정리하고 참조가 없는 blob 삭제, 삭제한 blob 수 반환
+
+        참조가 없는 blob 도 ORPHAN_GRACE_SECONDS 안에 등록/재사용된 것은 남겨 둡니다
+        (put 과 link 사이에 다른 프로세스가 정리하는 경우 대비).
+        """
+        removed = 0
+        expire_before = time.time() - ORPHAN_GRACE_SECONDS
+        with self._write() as conn:
+            dead = [
+                (view_path,) for view_path, digest in conn.execute("SELECT view_path, digest FROM refs")
+                if not self._points_to_blob(view_path, digest)
+            ]
+            conn.executemany("DELETE FROM refs WHERE view_path = ?", dead)
+
+            for blob_path in self.root.glob("??/*"):
+                if blob_path.stat().st_mtime >= expire_before:
+                    continue
+                referenced = conn.execute("SELECT 1 FROM refs WHERE digest = ? LIMIT 1", (blob_path.name,)).fetchone()
+                if referenced is None:
+                    self._remove_blob(blob_path.name)
+                    removed += 1
+
+        if removed:
+            logger.info(f"참조가 없는 blob {removed}개 삭제")
+        return removed
+
+    def _points_to_blob(self, view_path: str, digest: str) -> bool:
+        try:
+            return os.path.samefile(view_path, self.blob_path(digest))
+        except OSError:
+            return False
+
+    def _remove_blob(self, digest: str):
+        blob_path = self.blob_path(digest)
+        if blob_path.exists():
+            os.chmod(blob_path, stat.S_IRUSR | stat.S_IWUSR)
+            blob_path.unlink()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # 트랜잭션은 _write 에서 직접 시작
+            conn = sqlite3.connect(
+                str(self.root / REFS_DB_FILENAME),
+                timeout=REFS_DB_BUSY_TIMEOUT_MS / 1000,
+                isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={REFS_DB_BUSY_TIMEOUT_MS}")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _write(self):
+        """프로세스 간 쓰기 잠금을 잡은 트랜잭션"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+_store: Optional[BlobStore] = None
+_store_lock = threading.Lock()
+
+
+def get_blob_store() -> BlobStore:
+    """프로세스 전역 blob 저장소 반환"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = BlobStore()
+    return _store
@@ -0,0 +1,296 @@
+import os
+import random
+import logging
+from typing import Dict, Iterator, List, Optional, Sequence
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# train_cluster.py 와 같은 기본값 (코드북 크기 10000, 배치 4096, 최대 80회 반복)
+CLUSTER_COUNT = int(os.getenv("SVC_CLUSTER_COUNT", "10000"))
+CLUSTER_BATCH_SIZE = int(os.getenv("SVC_CLUSTER_BATCH_SIZE", "4096"))
+CLUSTER_MAX_EPOCHS = int(os.getenv("SVC_CLUSTER_MAX_EPOCHS", "80"))
+# 기존 코드북에 새 샘플만 반영할 때의 최대 반복 수
+CLUSTER_INCREMENTAL_EPOCHS = int(os.getenv("SVC_CLUSTER_INCREMENTAL_EPOCHS", "10"))
+# 에폭 평균 거리의 상대 개선량이 이보다 작은 에폭이 CLUSTER_PATIENCE 번 이어지면 중단
+CLUSTER_TOL = float(os.getenv("SVC_CLUSTER_TOL", "1e-3"))
+CLUSTER_PATIENCE = int(os.getenv("SVC_CLUSTER_PATIENCE", "3"))
+# 배정 수가 최대 배정 수의 이 비율보다 작은 중심은 배치 안의 먼 프레임으로 옮김 (sklearn reassignment_ratio 와 같음)
+CLUSTER_REASSIGNMENT_RATIO = float(os.getenv("SVC_CLUSTER_REASSIGNMENT_RATIO", "0.01"))
+# 파일 단위로 읽은 프레임을 섞어 배치를 만드는 버퍼 크기 (배치 수)
+SHUFFLE_BUFFER_BATCHES = 4
+# 최근접 중심 계산 시 한 번에 처리하는 프레임 수 (거리 행렬 메모리 제한)
+ASSIGN_CHUNK_SIZE = 1024
+
+
+class StreamingKMeans:
+    """배치 단위로 중심을 갱신하는 미니배치 k-means
+
+    중심마다 지금까지 배정된 프레임 수를 유지하므로, 저장된 코드북에서 이어서
+    새 특징만 흘려 넣어도 기존 데이터의 비중이 보존됩니다.
+    sklearn MiniBatchKMeans 와 같이 10 × 중심 수만큼 프레임을 처리할 때마다 배정이 거의 없는
+    중심을 배치의 먼 프레임으로 옮깁니다. sklearn 과 달리 빈 중심이 있다고 매 배치 옮기지는
+    않는데, 중심 수가 배치보다 큰 경우(기본 10000 > 4096) 아직 배정받지 못한 k-means++
+    초기 중심까지 흩어 버리기 때문입니다.
+    """
+
+    def __init__(
+        self,
+        centers: np.ndarray,
+        counts: Optional[np.ndarray] = None,
+        reassignment_ratio: float = CLUSTER_REASSIGNMENT_RATIO,
+        seed: int = 0
+    ):
+        self.centers = np.ascontiguousarray(centers, dtype=np.float32)
+        self.counts = np.zeros(len(centers), dtype=np.float64) if counts is None else counts.astype(np.float64)
+        self.reassignment_ratio = reassignment_ratio
+        self._rng = np.random.default_rng(seed)
+        self._since_reassign = 0
+
+    @classmethod
+    def from_codebook(cls, codebook: Dict, seed: int = 0) -> "StreamingKMeans":
+        return cls(np.asarray(codebook["cluster_centers_"]), codebook.get("counts_"), seed=seed)
+
+    @property
+    def n_clusters(self) -> int:
+        return len(self.centers)
+
+    @property
+    def n_features(self) -> int:
+        return self.centers.shape[1]
+
+    def partial_fit(self, batch: np.ndarray) -> float:
+        """배치 하나로 중심 갱신, 배치의 제곱 거리 합 반환"""
+        labels, distances = self.assign(batch)
+
+        batch_counts = np.bincount(labels, minlength=self.n_clusters).astype(np.float64)
+        sums = np.zeros_like(self.centers, dtype=np.float64)
+        np.add.at(sums, labels, batch)
+
+        updated = batch_counts > 0
+        new_counts = self.counts[updated] + batch_counts[updated]
+        self.centers[updated] = (
+            (self.centers[updated] * self.counts[updated, None] + sums[updated]) / new_counts[:, None]
+        ).astype(np.float32)
+        self.counts[updated] = new_counts
+
+        self._since_reassign += len(batch)
+        if self.reassignment_ratio > 0 and self._since_reassign >= 10 * self.n_clusters:
+            self._reassign(batch, distances)
+            self._since_reassign = 0
+        return float(distances.sum())
+
+    def _reassign(self, batch: np.ndarray, distances: np.ndarray):
+        """배정이 거의 없는 중심을 현재 중심에서 먼 프레임일수록 잘 뽑히도록 골라 옮김"""
+        to_reassign = self.counts < self.reassignment_ratio * self.counts.max()
+        # 한 번에 배치 크기의 절반까지만 옮김 (배정 수가 가장 적은 중심부터)
+        limit = len(batch) // 2
+        if to_reassign.sum() > limit:
+            to_reassign[np.argsort(self.counts)[limit:]] = False
+        reassign_count = int(to_reassign.sum())
+        if reassign_count == 0 or reassign_count == self.n_clusters:
+            return
+
+        weights = distances.astype(np.float64)
+        total = weights.sum()
+        if total <= 0:
+            return
+        picked = self._rng.choice(len(batch), size=reassign_count, replace=False, p=weights / total)
+        self.centers[to_reassign] = batch[picked]
+        # 옮긴 중심이 다음 배치 하나로 곧바로 끌려가지 않도록 남은 중심의 최소 배정 수를 부여
+        self.counts[to_reassign] = self.counts[~to_reassign].min()
+
+    def assign(self, frames: np.ndarray):
+        """프레임별 최근접 중심과 제곱 거리"""
+        center_norms = np.einsum("ij,ij->i", self.centers, self.centers)
+        labels = np.empty(len(frames), dtype=np.int64)
+        distances = np.empty(len(frames), dtype=np.float32)
+        for start in range(0, len(frames), ASSIGN_CHUNK_SIZE):
+            chunk = frames[start:start + ASSIGN_CHUNK_SIZE]
+            # |x - c|^2 = |x|^2 - 2x·c + |c|^2
+            scores = center_norms[None, :] - 2.0 * chunk @ self.centers.T
+            nearest = scores.argmin(axis=1)
+            labels[start:start + len(chunk)] = nearest
+            distances[start:start + len(chunk)] = np.maximum(
+                scores[np.arange(len(chunk)), nearest] + np.einsum("ij,ij->i", chunk, chunk), 0.0
+            )
+        return labels, distances
+
+    def to_codebook(self) -> Dict:
+        """so-vits-svc cluster.get_cluster_model 이 읽는 형식 (+ 이어서 학습용 counts_)"""
+        return {
+            "n_features_in_": self.n_features,
+            "_n_threads": os.cpu_count() or 1,
+            "cluster_centers_": self.centers,
+            "counts_": self.counts
+        }
+
+
+def load_features(path: str) -> np.ndarray:
+    """<wav>.soft.pt 를 (프레임 수, 특징 차원) float32 배열로 읽음 (train_cluster.py 와 같은 변환)"""
+    import torch
+
+    features = torch.load(path, map_location="cpu")
+    return np.ascontiguousarray(features.squeeze(0).numpy().T, dtype=np.float32)
+
+
+def iter_feature_batches(paths: Sequence[str], batch_size: int, rng: random.Random) -> Iterator[np.ndarray]:
+    """파일을 하나씩 읽어 섞은 뒤 고정 크기 배치로 내보냄 (전체 특징을 메모리에 올리지 않음)"""
+    paths = list(paths)
+    rng.shuffle(paths)
+    buffer: List[np.ndarray] = []
+    buffered = 0
+
+    for path in paths:
+        frames = load_features(path)
+        buffer.append(frames)
+        buffered += len(frames)
+        if buffered < batch_size * SHUFFLE_BUFFER_BATCHES:
+            continue
+
+        pool = np.concatenate(buffer)
+        pool = pool[np.random.default_rng(rng.getrandbits(32)).permutation(len(pool))]
+        usable = len(pool) - len(pool) % batch_size
+        for start in range(0, usable, batch_size):
+            yield pool[start:start + batch_size]
+        buffer, buffered = [pool[usable:]], len(pool) - usable
+
+    if buffered:
+        pool = np.concatenate(buffer)
+        pool = pool[np.random.default_rng(rng.getrandbits(32)).permutation(len(pool))]
+        for start in range(0, len(pool), batch_size):
+            yield pool[start:start + batch_size]
+
+
+def sample_initial_centers(
+    paths: Sequence[str],
+    n_clusters: int,
+    rng: random.Random,
+    batch_size: int = CLUSTER_BATCH_SIZE
+) -> np.ndarray:
+    """저장소 샘플링으로 모은 프레임에 k-means++ 를 적용해 초기 중심 선택
+
+    sklearn MiniBatchKMeans 의 init_size 와 같이 3 × 배치 크기만큼 균등하게 뽑되, 기본값처럼
+    중심 수가 배치보다 크면 중심마다 평균 세 프레임이 돌아가도록 3 × 중심 수만큼 뽑습니다.
+    프레임 수가 n_clusters 보다 적으면 전체 프레임을 반환합니다.
+    """
+    sample_size = 3 * max(batch_size, n_clusters)
+    reservoir: Optional[np.ndarray] = None
+    seen = 0
+    for path in paths:
+        frames = load_features(path)
+        if reservoir is None:
+            reservoir = np.empty((sample_size, frames.shape[1]), dtype=np.float32)
+
+        for frame in frames:
+            if seen < sample_size:
+                reservoir[seen] = frame
+            else:
+                slot = rng.randrange(seen + 1)
+                if slot < sample_size:
+                    reservoir[slot] = frame
+            seen += 1
+
+    if reservoir is None:
+        raise ValueError("클러스터링할 특징 파일이 없습니다")
+    reservoir = reservoir[:min(seen, sample_size)]
+    if len(reservoir) <= n_clusters:
+        return reservoir.copy()
+    return kmeans_plusplus(reservoir, n_clusters, np.random.default_rng(rng.getrandbits(32)))
+
+
+def kmeans_plusplus(points: np.ndarray, n_clusters: int, rng: np.random.Generator) -> np.ndarray:
+    """greedy k-means++ (sklearn 과 같이 매 단계 2 + log(k) 개 후보 중 전체 거리 합이 가장 작은 것 선택)"""
+    local_trials = 2 + int(np.log(n_clusters))
+    point_norms = np.einsum("ij,ij->i", points, points)
+
+    def squared_distances(candidates: np.ndarray) -> np.ndarray:
+        candidate_norms = np.einsum("ij,ij->i", candidates, candidates)
+        distances = candidate_norms[:, None] - 2.0 * candidates @ points.T + point_norms[None, :]
+        return np.maximum(distances, 0.0, out=distances)
+
+    centers = np.empty((n_clusters, points.shape[1]), dtype=np.float32)
+    first = rng.integers(len(points))
+    centers[0] = points[first]
+    closest = squared_distances(points[first:first + 1])[0]
+    potential = float(closest.sum(dtype=np.float64))
+
+    for index in range(1, n_clusters):
+        if potential <= 0:
+            # 남은 프레임이 모두 기존 중심과 같으면 무작위로 채움
+            centers[index:] = points[rng.integers(len(points), size=n_clusters - index)]
+            break
+
+        cumulative = np.cumsum(closest, dtype=np.float64)
+        candidates = np.minimum(np.searchsorted(cumulative, rng.random(local_trials) * potential), len(points) - 1)
+        candidate_distances = np.minimum(squared_distances(points[candidates]), closest[None, :])
+        potentials = candidate_distances.sum(axis=1, dtype=np.float64)
+        best = int(potentials.argmin())
+
+        centers[index] = points[candidates[best]]
+        closest = candidate_distances[best]
+        potential = float(potentials[best])
+
+    return centers
+
+
+def fit_codebook(
+    paths: Sequence[str],
+    n_clusters: int = CLUSTER_COUNT,
+    init: Optional[Dict] = None,
+    max_epochs: Optional[int] = None,
+    batch_size: int = CLUSTER_BATCH_SIZE,
+    tol: float = CLUSTER_TOL,
+    patience: int = CLUSTER_PATIENCE,
+    seed: int = 0
+) -> Dict:
+    """특징 파일을 흘려 읽으며 코드북 학습
+
+    init 에 기존 코드북을 주면 그 중심과 배정 수에서 시작해 paths(새 샘플 특징)만 반영하고,
+    없으면 저장소 샘플링으로 초기 중심을 잡은 뒤 paths 전체로 학습합니다.
+    """
+    rng = random.Random(seed)
+    if init is not None:
+        model = StreamingKMeans.from_codebook(init, seed=seed)
+        max_epochs = max_epochs or CLUSTER_INCREMENTAL_EPOCHS
+    else:
+        model = StreamingKMeans(sample_initial_centers(paths, n_clusters, rng, batch_size), seed=seed)
+        max_epochs = max_epochs or CLUSTER_MAX_EPOCHS
+
+    previous_inertia = None
+    stalled = 0
+    for epoch in range(1, max_epochs + 1):
+        total_distance = 0.0
+        total_frames = 0
+        for batch in iter_feature_batches(paths, batch_size, rng):
+            total_distance += model.partial_fit(batch)
+            total_frames += len(batch)
+
+        inertia = total_distance / max(1, total_frames)
+        if previous_inertia is not None and previous_inertia > 0:
+            improvement = (previous_inertia - inertia) / previous_inertia
+            stalled = stalled + 1 if improvement < tol else 0
+            if stalled >= patience:
+                logger.info(f"클러스터링 조기 종료: {epoch}에폭, 평균 거리 {inertia:.4f}")
+                break
+        previous_inertia = inertia
+
+    return model.to_codebook()
+
+
+def load_codebooks(path: str) -> Optional[Dict[str, Dict]]:
+    """화자별 코드북(kmeans.pt) 읽기"""
+    import torch
+
+    if not os.path.exists(path):
+        return None
+    return torch.load(path, map_location="cpu")
+
+
+def save_codebooks(path: str, codebooks: Dict[str, Dict]):
+    """화자별 코드북 저장 (임시 파일에 쓴 뒤 교체)"""
+    import torch
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    torch.save(codebooks, tmp_path)
+    os.replace(tmp_path, path)
@@ -0,0 +1,76 @@
+import os
+import time
+import logging
+from typing import Dict, Optional
+from app.services.job_queue import get_job_queue
+from app.services.progress import ProgressCallback
+from app.services.downloader import download_audio_from_url
+from app.services.splitter import separate_audio_arrays
+from app.services.svc import convert_vocals_array
+from app.services.mixer import Stem, mix_stems, OUTPUT_FORMATS
+
+logger = logging.getLogger(__name__)
+
+
+def create_cover(
+    user_id: str,
+    url: Optional[str] = None,
+    input_path: Optional[str] = None,
+    transpose: int = 0,
+    output_format: str = "mp3",
+    vocals_gain_db: float = 0.0,
+    instrumental_gain_db: float = 0.0,
+    vocals_pan: float = 0.0,
+    instrumental_pan: float = 0.0,
+    progress: Optional[ProgressCallback] = None
+) -> Dict:
+    """다운로드 → 분리 → 보컬 변환 → 믹싱을 하나의 작업으로 실행
+
+    단계 사이의 스템은 float32 배열로 메모리에서 바로 넘기므로 중간 WAV를 쓰고 다시
+    디코딩하지 않습니다. 디스크에는 재사용 가능한 산출물(다운로드 캐시, 분리 캐시)과
+    최종 결과만 남습니다. 각 단계는 작업 큐의 해당 단계 워커 풀에서 실행되어
+    단독 작업과 같은 동시 실행 제한을 공유합니다.
+    """
+    if (url is None) == (input_path is None):
+        raise ValueError("url 과 input_path 중 하나만 지정해야 합니다")
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"지원하지 않는 출력 형식입니다: {output_format}")
+
+    queue = get_job_queue()
+    timings: Dict[str, float] = {}
+
+    def run(stage: str, func, *args, **kwargs):
+        started = time.monotonic()
+        result = queue.run_in_stage(stage, func, *args, **kwargs)
+        timings[stage] = round(time.monotonic() - started, 2)
+        return result
+
+    if url is not None:
+        # 분리기가 원본 스트림을 바로 디코딩하므로 MP3 재인코딩 없이 받음
+        input_path = run("download", download_audio_from_url, url, audio_format="native", progress=progress)
+    elif not os.path.exists(input_path):
+        raise FileNotFoundError(f"입력 파일이 없습니다: {input_path}")
+
+    stems = run("split", separate_audio_arrays, input_path, progress=progress)
+    converted, converted_rate = run(
+        "convert", convert_vocals_array,
+        stems["vocals"], stems["sample_rate"], user_id, transpose=transpose, progress=progress
+    )
+    # 변환에 쓴 원본 보컬은 더 이상 필요 없으므로 믹싱 전에 해제
+    del stems["vocals"]
+
+    if progress:
+        progress("mix", None)
+    output_path = run("mix", mix_stems, [
+        Stem.from_array(stems["accompaniment"], stems["sample_rate"], instrumental_gain_db, instrumental_pan),
+        Stem.from_array(converted, converted_rate, vocals_gain_db, vocals_pan)
+    ], output_format)
+    if progress:
+        progress("mix", 1.0)
+
+    logger.info(f"커버 생성 완료: {output_path} (단계별 소요 시간: {timings})")
+    return {
+        "file_path": output_path,
+        "source_path": input_path,
+        "timings": timings
+    }
@@ -0,0 +1,171 @@
+import os
+import glob
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 다운로드 캐시 디스크 예산 (바이트)
+DOWNLOAD_CACHE_MAX_BYTES = int(os.getenv("DOWNLOAD_CACHE_MAX_BYTES", str(10 * 1024 ** 3)))
+# 캐시 항목 유효 시간 (초)
+DOWNLOAD_CACHE_TTL_SECONDS = int(os.getenv("DOWNLOAD_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+INDEX_FILENAME = ".download_cache.db"
+# 이 시간 안에 사용된 항목은 TTL/예산을 넘어도 삭제하지 않음 (초)
+DOWNLOAD_CACHE_IN_USE_SECONDS = 600
+# 다른 프로세스가 쓰기 잠금을 잡고 있을 때 기다리는 최대 시간 (밀리초)
+INDEX_BUSY_TIMEOUT_MS = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    media_key TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries (last_access);
+"""
+
+
+class DownloadCache:
+    """추출기 + 영상 ID(미디어 키)로 다운로드 결과를 재사용하는 캐시
+
+    같은 미디어 키에 대한 동시 요청은 하나의 다운로드로 합쳐지고,
+    나머지 요청은 그 결과를 기다렸다가 같은 파일을 받습니다.
+    TTL 이 지났거나 디스크 예산을 넘은 항목은 오래 사용하지 않은 순으로 삭제합니다.
+
+    색인은 SQLite(WAL) 에 항목마다 한 행으로 두어, 여러 워커 프로세스가 함께 써도 서로의
+    항목을 잃지 않고 조회 시에는 사용 시각 한 칸만 갱신합니다. 조회와 정리는 모두 쓰기
+    트랜잭션(BEGIN IMMEDIATE) 안에서 이루어지고, 최근 사용된 항목은 정리하지 않으므로
+    다른 프로세스가 막 돌려준 파일이 전송 중에 지워지지 않습니다.
+    """
+
+    def __init__(
+        self,
+        download_dir: str,
+        max_bytes: int = DOWNLOAD_CACHE_MAX_BYTES,
+        ttl_seconds: int = DOWNLOAD_CACHE_TTL_SECONDS
+    ):
+        self.download_dir = download_dir
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._inflight: Dict[str, Future] = {}
+
+    def get_or_download(self, media_key: str, download: Callable[[], str]) -> str:
+        """캐시 적중 시 기존 파일 반환, 아니면 download() 를 한 번만 실행"""
+        with self._lock:
+            cached = self._get(media_key)
+            if cached is not None:
+                logger.info(f"다운로드 캐시 적중: {media_key}")
+                return cached
+
+            future = self._inflight.get(media_key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[media_key] = future
+
+        if not owner:
+            logger.info(f"진행 중인 다운로드 대기: {media_key}")
+            return future.result()
+
+        try:
+            path = download()
+            with self._lock:
+                self._put(media_key, path)
+            future.set_result(path)
+            return path
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(media_key, None)
+
+    def _get(self, media_key: str) -> Optional[str]:
+        with self._write() as conn:
+            row = conn.execute("SELECT path, created_at FROM entries WHERE media_key = ?", (media_key,)).fetchone()
+            if row is None:
+                return None
+
+            path, created_at = row
+            if not os.path.exists(path) or time.time() - created_at > self.ttl_seconds:
+                self._remove(conn, media_key, path)
+                return None
+
+            conn.execute("UPDATE entries SET last_access = ? WHERE media_key = ?", (time.time(), media_key))
+            return path
+
+    def _put(self, media_key: str, path: str):
+        now = time.time()
+        with self._write() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (media_key, path, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (media_key, path, os.path.getsize(path), now, now)
+            )
+            self._evict(conn, keep=media_key)
+
+    def _evict(self, conn: sqlite3.Connection, keep: str):
+        now = time.time()
+        # 다른 워커가 방금 돌려준 파일은 아직 전송 중일 수 있으므로 삭제 대상에서 제외
+        in_use_after = now - DOWNLOAD_CACHE_IN_USE_SECONDS
+        expired = conn.execute(
+            "SELECT media_key, path FROM entries WHERE created_at < ? AND last_access < ? AND media_key != ?",
+            (now - self.ttl_seconds, in_use_after, keep)
+        ).fetchall()
+        for media_key, path in expired:
+            self._remove(conn, media_key, path)
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        candidates = conn.execute(
+            "SELECT media_key, path, size FROM entries WHERE last_access < ? AND media_key != ? ORDER BY last_access",
+            (in_use_after, keep)
+        ).fetchall()
+        for media_key, path, size in candidates:
+            if total <= self.max_bytes:
+                break
+            total -= size
+            self._remove(conn, media_key, path)
+
+    def _remove(self, conn: sqlite3.Connection, media_key: str, path: str):
+        conn.execute("DELETE FROM entries WHERE media_key = ?", (media_key,))
+        # 원본과 함께 요청 시 만들어진 재생용 변환본(같은 이름, 다른 확장자)도 삭제
+        for produced in glob.glob(f"{glob.escape(os.path.splitext(path)[0])}.*"):
+            os.remove(produced)
+        logger.info(f"다운로드 캐시 항목 삭제: {media_key}")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(self.download_dir, exist_ok=True)
+            # 트랜잭션은 _write 에서 직접 시작
+            conn = sqlite3.connect(
+                os.path.join(self.download_dir, INDEX_FILENAME),
+                timeout=INDEX_BUSY_TIMEOUT_MS / 1000,
+                isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={INDEX_BUSY_TIMEOUT_MS}")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _write(self):
+        """프로세스 간 쓰기 잠금을 잡은 트랜잭션"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
@@ -0,0 +1,113 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+FEATURE_CACHE_DIR = os.getenv("TRAINING_FEATURE_CACHE_DIR", "training_cache/features")
+
+META_FILE = "meta.json"
+RESAMPLED_FILE = "audio.wav"
+
+
+class FeatureCache:
+    """학습 전처리 결과(리샘플링 오디오, HuBERT 특징, F0)를 샘플 해시 단위로 보관하는 캐시
+
+    샘플 내용 해시 아래에 추출기 버전별 디렉토리를 두므로, 같은 샘플은 사용자나
+    학습 횟수와 관계없이 한 번만 처리됩니다. 추출기 설정이 바뀌면 버전 ID가 달라져
+    자연스럽게 다시 계산됩니다.
+
+    <해시 앞 2자리>/<해시>/resample-<버전>/audio.wav
+    <해시 앞 2자리>/<해시>/features-<버전>/<접미사 파일들> + meta.json
+    """
+
+    def __init__(self, cache_dir: str = FEATURE_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_version(params: Dict) -> str:
+        """추출기 설정으로 버전 ID 생성"""
+        payload = json.dumps(params, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def resampled(self, sample_hash: str, version: str) -> Optional[Path]:
+        path = self._entry_dir(sample_hash, f"resample-{version}") / RESAMPLED_FILE
+        return path if path.exists() else None
+
+    def put_resampled(self, sample_hash: str, version: str, wav_path: str) -> Path:
+        """리샘플링 결과를 캐시로 이동 (같은 디렉토리의 임시 파일을 거쳐 교체)"""
+        entry_dir = self._entry_dir(sample_hash, f"resample-{version}")
+        entry_dir.mkdir(parents=True, exist_ok=True)
+        target = entry_dir / RESAMPLED_FILE
+        tmp_path = entry_dir / f".{RESAMPLED_FILE}.{os.getpid()}-{threading.get_ident()}.tmp"
+        shutil.move(wav_path, tmp_path)
+        os.replace(tmp_path, target)
+        return target
+
+    def features(self, sample_hash: str, version: str) -> Optional[Dict[str, Path]]:
+        """캐시된 특징 파일 {접미사: 경로} 반환 (예: {"wav.soft.pt": ..., "wav.f0.npy": ...})"""
+        entry_dir = self._entry_dir(sample_hash, f"features-{version}")
+        try:
+            with (entry_dir / META_FILE).open("r") as f:
+                meta = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+        files = {suffix: entry_dir / suffix for suffix in meta["suffixes"]}
+        if not all(path.exists() for path in files.values()):
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            return None
+        return files
+
+    def put_features(self, sample_hash: str, version: str, files: Dict[str, str]) -> Dict[str, Path]:
+        """새로 추출한 특징 파일을 캐시로 복사 (디렉토리 단위로 교체)"""
+        entry_dir = self._entry_dir(sample_hash, f"features-{version}")
+        staging_dir = entry_dir.with_name(f".staging-{entry_dir.name}-{os.getpid()}-{threading.get_ident()}")
+        staging_dir.mkdir(parents=True, exist_ok=True)
+
+        for suffix, path in files.items():
+            shutil.copyfile(path, staging_dir / suffix)
+        with (staging_dir / META_FILE).open("w") as f:
+            json.dump({"suffixes": sorted(files)}, f)
+
+        with self._lock:
+            try:
+                os.rename(staging_dir, entry_dir)
+            except OSError:
+                # 다른 사용자의 학습이 같은 샘플을 먼저 저장한 경우
+                shutil.rmtree(staging_dir, ignore_errors=True)
+
+        return self.features(sample_hash, version) or {}
+
+    def _entry_dir(self, sample_hash: str, name: str) -> Path:
+        return self.cache_dir / sample_hash[:2] / sample_hash / name
+
+
+def link_or_copy(src: Path, dst: Path):
+    """캐시 파일을 작업 공간에 연결 (하드링크 불가 시 복사)"""
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+_cache: Optional[FeatureCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_feature_cache() -> FeatureCache:
+    """프로세스 전역 학습 특징 캐시 반환"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = FeatureCache()
+    return _cache
@@ -0,0 +1,84 @@
+import os
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Optional, Set
+from fastapi import UploadFile, HTTPException
+
+logger = logging.getLogger(__name__)
+
+# 업로드 최대 크기 (바이트)
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(200 * 1024 ** 2)))
+# 한 번에 읽고 쓰는 크기
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+ALLOWED_AUDIO_TYPES = {
+    "audio/mpeg", "audio/mp3", "audio/wav", "audio/x-wav", "audio/wave", "audio/vnd.wave",
+    "audio/flac", "audio/x-flac", "audio/ogg", "audio/opus", "audio/webm",
+    "audio/mp4", "audio/x-m4a", "audio/aac",
+}
+# 브라우저/클라이언트가 형식을 모를 때 보내는 타입은 확장자로 판단
+GENERIC_CONTENT_TYPES = {"", "application/octet-stream"}
+ALLOWED_AUDIO_EXTENSIONS = {".mp3", ".wav", ".flac", ".ogg", ".opus", ".webm", ".m4a", ".mp4", ".aac"}
+
+
+@dataclass
+class IngestResult:
+    """스트리밍 저장 결과"""
+    path: str
+    size: int
+    sha256: str
+    content_type: str
+
+
+async def ingest_upload(
+    upload: UploadFile,
+    dest_path: str,
+    max_bytes: int = UPLOAD_MAX_BYTES,
+    allowed_types: Optional[Set[str]] = ALLOWED_AUDIO_TYPES,
+    chunk_size: int = UPLOAD_CHUNK_SIZE
+) -> IngestResult:
+    """업로드 파일을 고정 크기 청크로 저장하면서 SHA-256 해시를 함께 계산
+
+    허용되지 않은 형식이면 읽기 전에, 크기 제한을 넘으면 넘는 즉시 중단하고
+    부분 파일을 삭제합니다. 완성된 파일만 dest_path 로 교체되어 나타납니다.
+    """
+    content_type = (upload.content_type or "").split(";")[0].strip().lower()
+    if allowed_types is not None:
+        _check_content_type(upload.filename or "", content_type, allowed_types)
+
+    digest = hashlib.sha256()
+    size = 0
+    part_path = f"{dest_path}.part"
+
+    try:
+        with open(part_path, "wb") as out:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"파일 크기가 제한({max_bytes // (1024 * 1024)}MB)을 초과했습니다"
+                    )
+                digest.update(chunk)
+                out.write(chunk)
+        os.replace(part_path, dest_path)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+
+    return IngestResult(path=dest_path, size=size, sha256=digest.hexdigest(), content_type=content_type)
+
+
+def _check_content_type(filename: str, content_type: str, allowed_types: Set[str]):
+    if content_type in allowed_types:
+        return
+    if content_type in GENERIC_CONTENT_TYPES and os.path.splitext(filename)[1].lower() in ALLOWED_AUDIO_EXTENSIONS:
+        return
+
+    logger.warning(f"허용되지 않은 업로드 형식: filename={filename}, content_type={content_type}")
+    raise HTTPException(status_code=415, detail=f"지원하지 않는 파일 형식입니다: {content_type or '알 수 없음'}")
@@ -0,0 +1,227 @@
+import os
+import time
+import queue
+import uuid
+import asyncio
+import inspect
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Any, Callable, Dict, Iterator, Optional
+from app.services.progress import get_progress_broker
+
+logger = logging.getLogger(__name__)
+
+# 단계별 동시 실행 수 (CPU를 많이 쓰는 작업이 HTTP 처리 스레드를 잠식하지 않도록 제한)
+STAGE_CONCURRENCY = {
+    "download": int(os.getenv("JOB_DOWNLOAD_CONCURRENCY", "4")),
+    "split": int(os.getenv("JOB_SPLIT_CONCURRENCY", "1")),
+    "convert": int(os.getenv("JOB_CONVERT_CONCURRENCY", "1")),
+    "train": int(os.getenv("JOB_TRAIN_CONCURRENCY", "1")),
+    "mix": int(os.getenv("JOB_MIX_CONCURRENCY", "2")),
+    # 다운로드→분리→변환→믹싱 파이프라인 (각 단계는 위 단계별 워커 풀에서 실행)
+    "cover": int(os.getenv("JOB_COVER_CONCURRENCY", "4")),
+}
+# 완료된 작업 정보를 보관하는 시간 (초)
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+# 스트리밍 작업이 소비자보다 앞서 만들어 둘 수 있는 최대 항목 수
+STREAM_BUFFER_ITEMS = int(os.getenv("JOB_STREAM_BUFFER_ITEMS", "8"))
+# 버퍼가 찬 스트리밍 워커가 소비자 종료 여부를 확인하는 주기 (초)
+STREAM_POLL_SECONDS = 1.0
+
+
+class Job:
+    """큐에 제출된 작업 하나의 상태"""
+
+    def __init__(self, stage: str, user_id: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.stage = stage
+        self.user_id = user_id
+        self.status = "queued"  # queued → running → done / failed
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.future: Optional[Future] = None
+        # 마지막 진행 이벤트 (폴링 클라이언트용)
+        self.progress: Optional[Dict] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "stage": self.stage,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": self.progress
+        }
+
+    def report(self, stage: str, progress: Optional[float] = None, **details):
+        """작업 함수가 호출하는 진행 콜백 (어느 스레드에서나 호출 가능)"""
+        self.progress = {"stage": stage, "progress": progress, **details}
+        get_progress_broker().publish(self.id, {"event": "progress", **self.progress})
+
+    def publish_status(self):
+        get_progress_broker().publish(self.id, {"event": "status", "status": self.status, "error": self.error})
+
+
+class JobQueue:
+    """단계별로 크기가 제한된 워커 풀에서 무거운 작업을 실행하는 작업 큐"""
+
+    def __init__(self, concurrency: Dict[str, int] = STAGE_CONCURRENCY):
+        self._executors = {
+            stage: ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix=f"job-{stage}")
+            for stage, workers in concurrency.items()
+        }
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, stage: str, func: Callable, *args, user_id: Optional[str] = None, **kwargs) -> Job:
+        """작업을 제출하고 즉시 Job 반환
+
+        func 가 progress 인자를 받으면 Job.report 를 넘겨 진행 이벤트를
+        /jobs/{id}/events 로 전달합니다.
+        """
+        if stage not in self._executors:
+            raise ValueError(f"알 수 없는 작업 단계입니다: {stage}")
+
+        job = Job(stage, user_id=user_id)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        if "progress" not in kwargs and _accepts_progress(func):
+            kwargs["progress"] = job.report
+        job.publish_status()
+        job.future = self._executors[stage].submit(self._run, job, func, args, kwargs)
+        logger.info(f"작업 제출: {job.id} ({stage})")
+        return job
+
+    async def run(self, stage: str, func: Callable, *args, user_id: Optional[str] = None, **kwargs) -> Any:
+        """작업을 제출하고 이벤트 루프를 막지 않고 결과를 기다림"""
+        job = self.submit(stage, func, *args, user_id=user_id, **kwargs)
+        return await asyncio.wrap_future(job.future)
+
+    def run_in_stage(self, stage: str, func: Callable, *args, **kwargs) -> Any:
+        """다른 작업 안에서 해당 단계의 워커 풀을 빌려 func 를 실행하고 결과를 기다림
+
+        단독 작업과 같은 동시 실행 제한을 공유합니다. 같은 단계의 워커 안에서 호출하면
+        교착 상태가 될 수 있으므로 파이프라인 작업(cover 단계)에서만 사용합니다.
+        """
+        return self.submit_in_stage(stage, func, *args, **kwargs).result()
+
+    def submit_in_stage(self, stage: str, func: Callable, *args, **kwargs) -> Future:
+        """run_in_stage 와 같지만 기다리지 않고 Future 반환 (여러 항목을 나눠 맡길 때 사용)"""
+        if stage not in self._executors:
+            raise ValueError(f"알 수 없는 작업 단계입니다: {stage}")
+        return self._executors[stage].submit(func, *args, **kwargs)
+
+    def iter_in_stage(self, stage: str, items: Iterator, buffer: int = STREAM_BUFFER_ITEMS) -> Iterator:
+        """해당 단계의 워커 하나를 점유한 채 items 를 소비하며 만들어진 항목을 차례로 내줌
+
+        스트리밍 응답처럼 오래 이어지는 작업도 단독 작업과 같은 동시 실행 제한을 공유합니다.
+        워커는 버퍼가 차면 기다리므로 소비 속도만큼만 진행하고, 소비자가 도중에 닫으면
+        items 를 닫고 워커를 반납합니다. items 에서 난 예외는 소비자 쪽에서 다시 발생합니다.
+        """
+        if stage not in self._executors:
+            raise ValueError(f"알 수 없는 작업 단계입니다: {stage}")
+
+        produced: "queue.Queue" = queue.Queue(maxsize=max(1, buffer))
+        closed = threading.Event()
+
+        def put(kind: str, value: Any) -> bool:
+            while not closed.is_set():
+                try:
+                    produced.put((kind, value), timeout=STREAM_POLL_SECONDS)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            try:
+                for item in items:
+                    if not put("item", item):
+                        return
+                put("done", None)
+            except BaseException as e:
+                put("error", e)
+            finally:
+                close = getattr(items, "close", None)
+                if close is not None:
+                    close()
+
+        self._executors[stage].submit(produce)
+        try:
+            while True:
+                kind, value = produced.get()
+                if kind == "done":
+                    return
+                if kind == "error":
+                    raise value
+                yield value
+        finally:
+            closed.set()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: Job, func: Callable, args: tuple, kwargs: dict) -> Any:
+        job.status = "running"
+        job.started_at = time.time()
+        job.publish_status()
+        try:
+            job.result = func(*args, **kwargs)
+        except Exception as e:
+            job.error = str(e)
+            logger.error(f"작업 실패: {job.id} ({job.stage}), 에러: {str(e)}")
+            self._finish(job, "failed")
+            raise
+        self._finish(job, "done")
+        return job.result
+
+    @staticmethod
+    def _finish(job: Job, status: str):
+        # 완료 상태가 보이는 순간 finished_at 도 있어야 _prune 이 다른 스레드에서 비교할 수 있음
+        job.finished_at = time.time()
+        job.status = status
+        job.publish_status()
+
+    def _prune(self):
+        """보관 시간이 지난 완료 작업 정리"""
+        expire_before = time.time() - JOB_RETENTION_SECONDS
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and job.finished_at < expire_before
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+            get_progress_broker().discard(job_id)
+
+
+def _accepts_progress(func: Callable) -> bool:
+    try:
+        return "progress" in inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """프로세스 전역 작업 큐 반환"""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = JobQueue()
+    return _queue
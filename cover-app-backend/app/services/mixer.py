@@ -0,0 +1,375 @@
+import os
+import math
+import uuid
+import logging
+import subprocess
+import tempfile
+import threading
+from contextlib import ExitStack
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+import numpy as np
+from app.utils.stem_format import is_stem, open_stem
+
+logger = logging.getLogger(__name__)
+
+FINAL_COVER_DIR = "final_covers"
+# 믹싱 결과 샘플레이트 (다른 샘플레이트의 스템은 ffmpeg 로 맞춤)
+MIX_SAMPLE_RATE = int(os.getenv("MIX_SAMPLE_RATE", "44100"))
+MIX_CHANNELS = 2
+# 한 번에 읽고 섞는 프레임 수 (곡 길이와 관계없이 메모리 사용량 일정)
+MIX_BLOCK_FRAMES = int(os.getenv("MIX_BLOCK_FRAMES", "65536"))
+# 리미터 최대 출력 (선형, 0.98 ≈ -0.2 dBFS)
+MIX_LIMITER_CEILING = float(os.getenv("MIX_LIMITER_CEILING", "0.98"))
+# 리미터 게인이 다시 1로 돌아오는 시간 상수 (밀리초)
+MIX_LIMITER_RELEASE_MS = float(os.getenv("MIX_LIMITER_RELEASE_MS", "80"))
+# 리미터 게인 계산 단위 (프레임)
+LIMITER_WINDOW_FRAMES = 256
+# 스트리밍 믹싱 블록 크기 (작을수록 첫 바이트가 빨리 나감)
+MIX_STREAM_BLOCK_FRAMES = int(os.getenv("MIX_STREAM_BLOCK_FRAMES", "8192"))
+# 인코더 출력에서 한 번에 읽어 내보내는 최대 크기
+STREAM_CHUNK_BYTES = 16 * 1024
+
+# 출력 형식별 ffmpeg 인코더 옵션
+OUTPUT_FORMATS = {
+    "mp3": {"args": ["-c:a", "libmp3lame", "-b:a", "192k", "-f", "mp3"], "media_type": "audio/mpeg"},
+    "opus": {"args": ["-c:a", "libopus", "-b:a", "128k", "-f", "ogg"], "media_type": "audio/ogg"},
+}
+
+
+@dataclass
+class Stem:
+    """믹싱할 스템 하나 (gain_db: 데시벨 게인, pan: -1 왼쪽 ~ 0 가운데 ~ 1 오른쪽)
+
+    path 대신 audio((프레임,) 또는 (프레임, 채널) 배열)와 sample_rate 를 주면
+    파일을 거치지 않고 메모리의 배열을 그대로 섞습니다. path 가 스템(.f32stem)이면
+    memmap 으로 열어 같은 방식으로 읽습니다.
+    """
+    path: Optional[str]
+    gain_db: float = 0.0
+    pan: float = 0.0
+    audio: Optional[np.ndarray] = None
+    sample_rate: int = 0
+
+    @classmethod
+    def from_array(cls, audio: np.ndarray, sample_rate: int, gain_db: float = 0.0, pan: float = 0.0) -> "Stem":
+        return cls(None, gain_db, pan, audio=audio, sample_rate=sample_rate)
+
+    def channel_gains(self) -> np.ndarray:
+        """-3dB 등전력 팬 법칙 (가운데에서 좌우 게인 1)"""
+        gain = 10 ** (self.gain_db / 20)
+        angle = (min(1.0, max(-1.0, self.pan)) + 1) * math.pi / 4
+        return np.array([math.cos(angle), math.sin(angle)], dtype=np.float32) * math.sqrt(2) * gain
+
+
+class PeakLimiter:
+    """블록 단위로 동작하는 피크 리미터
+
+    LIMITER_WINDOW_FRAMES 마다 필요한 게인을 구해 즉시 내리고(어택),
+    release 시간 상수로 천천히 1까지 되돌립니다. 창 경계 사이 게인은 선형 보간하되
+    양 끝 게인이 모두 창의 목표 게인 이하이므로 보간 중에도 최대 출력을 넘지 않습니다.
+    """
+
+    def __init__(self, sample_rate: int, ceiling: float = MIX_LIMITER_CEILING, release_ms: float = MIX_LIMITER_RELEASE_MS):
+        self.ceiling = ceiling
+        self.release = math.exp(-LIMITER_WINDOW_FRAMES / (release_ms / 1000 * sample_rate))
+        self._envelope = 1.0
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        frames = len(block)
+        if frames == 0:
+            return block
+
+        window_count = -(-frames // LIMITER_WINDOW_FRAMES)
+        peaks = np.abs(block).max(axis=1)
+        padded = np.zeros(window_count * LIMITER_WINDOW_FRAMES, dtype=np.float32)
+        padded[:frames] = peaks
+        window_peaks = padded.reshape(window_count, LIMITER_WINDOW_FRAMES).max(axis=1)
+        targets = np.minimum(1.0, self.ceiling / np.maximum(window_peaks, 1e-9))
+
+        envelope = np.empty(window_count, dtype=np.float64)
+        previous = self._envelope
+        for i, target in enumerate(targets):
+            released = 1.0 - (1.0 - previous) * self.release
+            previous = min(target, released)
+            envelope[i] = previous
+
+        # 창 경계 게인: 인접한 두 창 중 작은 값
+        boundaries = np.empty(window_count + 1, dtype=np.float64)
+        boundaries[0] = min(self._envelope, envelope[0])
+        boundaries[1:-1] = np.minimum(envelope[:-1], envelope[1:])
+        boundaries[-1] = envelope[-1]
+        self._envelope = envelope[-1]
+
+        positions = np.arange(frames, dtype=np.float64) / LIMITER_WINDOW_FRAMES
+        gains = np.interp(positions, np.arange(window_count + 1), boundaries).astype(np.float32)
+        limited = block * gains[:, None]
+        # 부동소수점 오차 대비 안전장치
+        return np.clip(limited, -self.ceiling, self.ceiling, out=limited)
+
+
+def iter_mixed_blocks(
+    stems: List[Stem],
+    sample_rate: int = MIX_SAMPLE_RATE,
+    block_frames: int = MIX_BLOCK_FRAMES
+) -> Iterator[np.ndarray]:
+    """스템들을 블록 단위로 읽어 게인/팬 적용 후 합치고 리미터를 거친 (프레임, 2) float32 블록을 내보냄
+
+    가장 짧은 스템 길이에 맞춰 끝납니다.
+    """
+    limiter = PeakLimiter(sample_rate)
+    with ExitStack() as stack:
+        temp_dir = stack.enter_context(tempfile.TemporaryDirectory(prefix="mix-"))
+        readers = [_open_reader(stem, sample_rate, stack, temp_dir) for stem in stems]
+        gains = [stem.channel_gains() for stem in stems]
+
+        while True:
+            blocks = [reader.read(block_frames, dtype="float32", always_2d=True) for reader in readers]
+            frames = min(len(block) for block in blocks)
+            if frames == 0:
+                break
+
+            mixed = np.zeros((frames, MIX_CHANNELS), dtype=np.float32)
+            for block, gain in zip(blocks, gains):
+                mixed += _to_stereo(block[:frames]) * gain
+            yield limiter.process(mixed)
+
+            if frames < block_frames:
+                break
+
+
+def iter_encoded_mix(
+    stems: List[Stem],
+    output_format: str = "mp3",
+    sample_rate: int = MIX_SAMPLE_RATE,
+    block_frames: int = MIX_STREAM_BLOCK_FRAMES
+) -> Iterator[bytes]:
+    """섞은 PCM 블록을 상주 ffmpeg 파이프에 바로 흘려 넣고, 인코딩된 바이트를 나오는 대로 내보냄
+
+    믹싱은 별도 스레드에서 ffmpeg stdin 으로 쓰고, 호출한 쪽은 stdout 을 읽으므로
+    전체 곡을 메모리나 임시 WAV로 만들지 않습니다. 소비를 중단하면 ffmpeg 를 종료합니다.
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"지원하지 않는 출력 형식입니다: {output_format}")
+
+    process = subprocess.Popen([
+        "ffmpeg", "-loglevel", "error",
+        "-f", "f32le", "-ar", str(sample_rate), "-ac", str(MIX_CHANNELS), "-i", "pipe:0",
+        *OUTPUT_FORMATS[output_format]["args"], "-flush_packets", "1", "pipe:1"
+    ], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    errors: List[Exception] = []
+
+    def feed():
+        try:
+            for block in iter_mixed_blocks(stems, sample_rate, block_frames):
+                process.stdin.write(block.astype("<f4", copy=False).tobytes())
+        except BrokenPipeError:
+            # 소비 중단으로 ffmpeg 가 먼저 종료된 경우
+            pass
+        except Exception as e:
+            errors.append(e)
+        finally:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+
+    feeder = threading.Thread(target=feed, name="mix-feed", daemon=True)
+    feeder.start()
+
+    completed = False
+    try:
+        while True:
+            chunk = process.stdout.read1(STREAM_CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
+
+        process.wait()
+        feeder.join()
+        if errors:
+            raise errors[0]
+        if process.returncode != 0:
+            raise RuntimeError(f"인코딩 실패: {process.stderr.read().decode(errors='ignore')}")
+        completed = True
+    finally:
+        if not completed:
+            process.kill()
+            process.wait()
+            feeder.join()
+        process.stdout.close()
+        process.stderr.close()
+
+
+def iter_mix_and_save(stems: List[Stem], output_format: str = "mp3") -> Tuple[str, Iterator[bytes]]:
+    """인코딩된 바이트를 내보내면서 final_covers/ 에도 기록, (최종 경로, 바이트 이터레이터) 반환
+
+    끝까지 인코딩된 경우에만 임시 파일을 최종 경로로 교체합니다.
+    """
+    os.makedirs(FINAL_COVER_DIR, exist_ok=True)
+    output_path = os.path.join(FINAL_COVER_DIR, f"final_{uuid.uuid4().hex[:8]}.{output_format}")
+
+    def stream():
+        tmp_path = f"{output_path}.tmp"
+        try:
+            with open(tmp_path, "wb") as out:
+                for chunk in iter_encoded_mix(stems, output_format):
+                    out.write(chunk)
+                    yield chunk
+            os.replace(tmp_path, output_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    return output_path, stream()
+
+
+def cover_stems(
+    vocals_path: str,
+    instrumental_path: str,
+    vocals_gain_db: float = 0.0,
+    instrumental_gain_db: float = 0.0,
+    vocals_pan: float = 0.0,
+    instrumental_pan: float = 0.0
+) -> List[Stem]:
+    return [
+        Stem(instrumental_path, instrumental_gain_db, instrumental_pan),
+        Stem(vocals_path, vocals_gain_db, vocals_pan)
+    ]
+
+
+def mix_stems(stems: List[Stem], output_format: str = "mp3") -> str:
+    """스템들을 섞어 final_covers/ 에 저장하고 경로 반환"""
+    output_path, chunks = iter_mix_and_save(stems, output_format)
+    for _ in chunks:
+        pass
+    return output_path
+
+
+def mix_vocals_and_instrumental(
+    vocals_path: str,
+    instrumental_path: str,
+    vocals_gain_db: float = 0.0,
+    instrumental_gain_db: float = 0.0,
+    vocals_pan: float = 0.0,
+    instrumental_pan: float = 0.0,
+    output_format: str = "mp3"
+) -> str:
+    """보컬과 반주를 섞어 final_covers/ 에 저장 (기본 MP3)"""
+    stems = cover_stems(vocals_path, instrumental_path, vocals_gain_db, instrumental_gain_db, vocals_pan, instrumental_pan)
+    return mix_stems(stems, output_format)
+
+
+class _ArrayReader:
+    """메모리 배열을 soundfile.SoundFile.read 와 같은 방식으로 블록 단위로 내주는 리더 (복사 없이 슬라이스)"""
+
+    def __init__(self, audio: np.ndarray):
+        self.audio = audio
+        self.position = 0
+
+    def read(self, frames: int, dtype: str = "float32", always_2d: bool = True) -> np.ndarray:
+        block = self.audio[self.position:self.position + frames]
+        self.position += len(block)
+        return block
+
+
+class _ResamplingReader:
+    """배열을 블록 단위로 읽으면서 그 구간만 리샘플링하는 리더
+
+    scipy.signal.resample_poly 와 같은 폴리페이즈 필터를 쓰되, 블록마다 필터 길이만큼
+    앞 입력을 겹쳐 upfirdn 을 돌리므로 결과는 곡 전체를 resample_poly 한 것과 같고
+    메모리에는 블록 크기만큼만 올라갑니다 (memmap 스템은 필요한 구간만 읽힘).
+    """
+
+    def __init__(self, audio: np.ndarray, source_rate: int, sample_rate: int):
+        from scipy.signal import firwin
+
+        divisor = math.gcd(source_rate, sample_rate)
+        self.up = sample_rate // divisor
+        self.down = source_rate // divisor
+        max_rate = max(self.up, self.down)
+        half_len = 10 * max_rate
+        taps = firwin(2 * half_len + 1, 1.0 / max_rate, window=("kaiser", 5.0)) * self.up
+        # resample_poly 와 같은 지연 보정 (앞에 0을 붙여 출력 위상을 down 단위로 맞춤)
+        pre_pad = self.down - half_len % self.down
+        self.taps = np.concatenate([np.zeros(pre_pad), taps])
+        self.delay = (half_len + pre_pad) // self.down
+        self.audio = audio
+        self.frames = -(-len(audio) * self.up // self.down)
+        self.position = 0
+
+    def read(self, frames: int, dtype: str = "float32", always_2d: bool = True) -> np.ndarray:
+        from scipy.signal import upfirdn
+
+        start = self.position
+        stop = min(self.frames, start + frames)
+        self.position = max(start, stop)
+        if stop <= start:
+            return np.zeros((0, self.audio.shape[1]), dtype=np.float32)
+
+        # 필터 지연을 포함한 전체 upfirdn 출력 기준 인덱스
+        first = start + self.delay
+        last = stop - 1 + self.delay
+        # first 출력에 닿는 가장 앞 입력 (down 의 배수에서 시작해야 출력 위상이 그대로 유지됨)
+        lo = max(0, (first * self.down - (len(self.taps) - 1)) // self.up)
+        lo -= lo % self.down
+        hi = min(len(self.audio), last * self.down // self.up + 1)
+
+        chunk = np.asarray(self.audio[lo:hi], dtype=np.float32)
+        resampled = upfirdn(self.taps, chunk, self.up, self.down, axis=0)
+        skip = first - lo * self.up // self.down
+        block = resampled[skip:skip + stop - start]
+        if len(block) < stop - start:
+            # 곡 끝: 입력 뒤쪽은 0 이므로 모자란 출력도 0
+            block = np.concatenate([block, np.zeros((stop - start - len(block), block.shape[1]))])
+        return block.astype(np.float32)
+
+
+def _to_stereo(block: np.ndarray) -> np.ndarray:
+    """채널 수를 스테레오로 맞춤 (모노는 복제, 3채널 이상은 앞 두 채널 사용)"""
+    if block.shape[1] == 1:
+        return np.repeat(block, 2, axis=1)
+    return block[:, :2]
+
+
+def _open_reader(stem: Stem, sample_rate: int, stack: ExitStack, temp_dir: str):
+    """스템 종류에 맞는 블록 리더 (배열/스템 파일은 슬라이스, 그 외 형식은 soundfile)"""
+    if stem.audio is not None:
+        return _array_reader(stem.audio, stem.sample_rate, sample_rate)
+    if is_stem(stem.path):
+        audio, info = open_stem(stem.path)
+        return _array_reader(audio, info.sample_rate, sample_rate)
+
+    import soundfile as sf
+    return stack.enter_context(sf.SoundFile(_aligned_path(stem.path, sample_rate, temp_dir)))
+
+
+def _array_reader(audio: np.ndarray, source_rate: int, sample_rate: int):
+    """배열을 (프레임, 채널) 로 맞추고 샘플레이트가 다르면 블록 단위로 리샘플링하는 리더 반환"""
+    if audio.ndim == 1:
+        audio = audio[:, None]
+    if source_rate == sample_rate:
+        return _ArrayReader(audio.astype(np.float32, copy=False))
+    return _ResamplingReader(audio, source_rate, sample_rate)
+
+
+def _aligned_path(path: str, sample_rate: int, temp_dir: str) -> str:
+    """soundfile 로 바로 읽을 수 있고 샘플레이트가 같으면 원본 경로, 아니면 ffmpeg 로 변환한 WAV 경로"""
+    import soundfile as sf
+
+    try:
+        if sf.info(path).samplerate == sample_rate:
+            return path
+    except RuntimeError:
+        # libsndfile 이 읽지 못하는 형식 (mp3/m4a/opus 등)
+        pass
+
+    aligned_path = os.path.join(temp_dir, f"{uuid.uuid4().hex[:8]}.wav")
+    result = subprocess.run([
+        "ffmpeg", "-y", "-loglevel", "error", "-i", path,
+        "-vn", "-ar", str(sample_rate), "-c:a", "pcm_f32le", aligned_path
+    ], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"스템 변환 실패: {path}, {result.stderr}")
+    return aligned_path
@@ -0,0 +1,78 @@
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 새 구독자에게 다시 보내주는 채널별 최근 이벤트 수
+HISTORY_SIZE = 50
+
+# 진행 상황 콜백 형식: progress(단계, 진행률(0-1 또는 None), **추가 정보)
+ProgressCallback = Callable[..., None]
+
+
+class ProgressBroker:
+    """작업 스레드에서 발생한 진행 이벤트를 SSE 구독자(asyncio)에게 전달
+
+    publish 는 어느 스레드에서 호출해도 되며, 각 구독자의 이벤트 루프로
+    call_soon_threadsafe 를 통해 전달됩니다. 늦게 연결한 구독자를 위해
+    채널마다 최근 이벤트를 보관합니다.
+    """
+
+    def __init__(self, history_size: int = HISTORY_SIZE):
+        self.history_size = history_size
+        self._subscribers: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._history: Dict[str, Deque[Dict]] = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel: str, event: Dict):
+        event = {**event, "time": time.time()}
+        with self._lock:
+            history = self._history.setdefault(channel, deque(maxlen=self.history_size))
+            history.append(event)
+            subscribers = list(self._subscribers.get(channel, []))
+
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                # 구독자의 이벤트 루프가 이미 닫힌 경우
+                pass
+
+    def subscribe(self, channel: str) -> Tuple[asyncio.Queue, List[Dict]]:
+        """현재 이벤트 루프에서 채널 구독, (큐, 지난 이벤트 목록) 반환"""
+        queue: asyncio.Queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._subscribers.setdefault(channel, []).append((loop, queue))
+            history = list(self._history.get(channel, []))
+        return queue, history
+
+    def unsubscribe(self, channel: str, queue: asyncio.Queue):
+        with self._lock:
+            subscribers = self._subscribers.get(channel, [])
+            self._subscribers[channel] = [s for s in subscribers if s[1] is not queue]
+            if not self._subscribers[channel]:
+                del self._subscribers[channel]
+
+    def discard(self, channel: str):
+        """끝난 채널의 보관 이벤트 삭제"""
+        with self._lock:
+            self._history.pop(channel, None)
+
+
+_broker: Optional[ProgressBroker] = None
+_broker_lock = threading.Lock()
+
+
+def get_progress_broker() -> ProgressBroker:
+    """프로세스 전역 진행 이벤트 브로커 반환"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = ProgressBroker()
+    return _broker
@@ -0,0 +1,229 @@
+import os
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Set
+from app.services.job_queue import get_job_queue, STAGE_CONCURRENCY
+from app.services.sample_index import get_sample_index
+from app.services.progress import ProgressCallback
+from app.services.trainer import BASE_DIR, TrainingInProgress, train_user_voice, load_train_state, is_training
+from app.services.voice_sample_service import VoiceSampleService
+
+logger = logging.getLogger(__name__)
+
+# 대기 중인 재학습을 확인하는 주기 (초)
+RETRAIN_POLL_SECONDS = int(os.getenv("RETRAIN_POLL_SECONDS", "60"))
+# 재학습을 허용하는 시간대 (예: "1-6" 은 01:00~05:59), 비워 두면 부하 기준만 적용
+RETRAIN_OFFPEAK_HOURS = os.getenv("RETRAIN_OFFPEAK_HOURS", "")
+# 코어당 1분 평균 부하가 이 값 이하일 때만 재학습 시작
+RETRAIN_MAX_LOAD = float(os.getenv("RETRAIN_MAX_LOAD", "0.7"))
+# 동시에 돌리는 자동 재학습 수 (수동 학습과 같은 train 단계 워커를 공유)
+RETRAIN_MAX_RUNNING = int(os.getenv("RETRAIN_MAX_RUNNING", str(STAGE_CONCURRENCY["train"])))
+# 자동 재학습 실패 후 첫 재시도까지 대기 시간 (초), 실패할 때마다 두 배씩 늘어남
+RETRAIN_BACKOFF_SECONDS = int(os.getenv("RETRAIN_BACKOFF_SECONDS", "600"))
+# 연속 실패가 이 횟수에 이르면 새 샘플이 들어올 때까지 재시도하지 않음
+RETRAIN_MAX_ATTEMPTS = int(os.getenv("RETRAIN_MAX_ATTEMPTS", "5"))
+
+
+class RetrainScheduler:
+    """새 샘플이 AUTO_RETRAIN_THRESHOLD 개 이상 쌓인 사용자의 재학습을 예약하는 백그라운드 스케줄러
+
+    샘플이 저장되면 notify() 로 사용자를 표시해 두고, 주기적으로 마지막 모델 학습 이후
+    추가/변경된 샘플 수를 셉니다. 기준을 넘은 사용자는 대기열에 한 번만 올라가며
+    (중복 제거), 허용 시간대와 CPU 부하 조건을 만족할 때 작업 큐의 train 단계로 제출됩니다.
+    이미 모델이 있는 사용자만 대상으로 하며, 첫 학습은 사용자가 직접 요청합니다.
+
+    대기열과 실행 목록은 프로세스마다 따로 있으므로, 워커 프로세스 여러 개가 같은 사용자를
+    동시에 재학습하지 않도록 trainer 의 사용자별 학습 잠금(flock)을 기다리지 않고 잡습니다.
+    잠금이 잡혀 있으면 실패로 세지 않고 다음 확인 때 다시 봅니다.
+
+    실패한 학습은 train_state.json 을 갱신하지 않아 곧바로 다시 기준을 넘으므로,
+    사용자별 연속 실패 수를 기록해 지수 백오프로 재시도하고 RETRAIN_MAX_ATTEMPTS 에
+    이르면 새 샘플이 들어올 때까지 멈춥니다.
+    """
+
+    def __init__(
+        self,
+        base_dir: str = BASE_DIR,
+        threshold: int = VoiceSampleService.AUTO_RETRAIN_THRESHOLD,
+        poll_seconds: int = RETRAIN_POLL_SECONDS
+    ):
+        self.base_dir = Path(base_dir)
+        self.threshold = threshold
+        self.poll_seconds = poll_seconds
+        self.sample_index = get_sample_index()
+        self._dirty: Set[str] = set()
+        # 사용자 → 대기열에 올라간 시각
+        self._pending: Dict[str, float] = {}
+        self._running: Dict[str, str] = {}
+        # 사용자 → {"attempts": 연속 실패 수, "retry_at": 다음 재시도 가능 시각}
+        self._failures: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        # 재시작 전에 쌓인 샘플도 확인하도록 모델이 있는 모든 사용자를 한 번 표시
+        if self.base_dir.exists():
+            with self._lock:
+                self._dirty.update(
+                    user_dir.name for user_dir in self.base_dir.iterdir()
+                    if (user_dir / "model" / "G_latest.pth").exists()
+                )
+        self._thread = threading.Thread(target=self._loop, name="retrain-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(f"자동 재학습 스케줄러 시작 (기준: 새 샘플 {self.threshold}개)")
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+
+    def notify(self, user_id: str):
+        """사용자 샘플이 추가/변경되었음을 알림"""
+        with self._lock:
+            self._dirty.add(user_id)
+            failure = self._failures.get(user_id)
+            if failure is not None and failure["attempts"] >= RETRAIN_MAX_ATTEMPTS:
+                # 재시도를 멈춘 사용자도 새 샘플이 들어오면 (백오프 후) 한 번 더 시도
+                failure["attempts"] = RETRAIN_MAX_ATTEMPTS - 1
+        self._wakeup.set()
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"자동 재학습 확인 실패: {str(e)}")
+            self._wakeup.wait(self.poll_seconds)
+            self._wakeup.clear()
+
+    def run_once(self):
+        now = time.time()
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            # 백오프가 끝난 실패 사용자는 다시 확인
+            dirty.update(
+                user_id for user_id, failure in self._failures.items()
+                if failure["retry_at"] <= now and failure["attempts"] < RETRAIN_MAX_ATTEMPTS
+            )
+
+        for user_id in dirty:
+            if self._backing_off(user_id, now):
+                continue
+            if is_training(user_id):
+                # 다른 프로세스(또는 수동 요청)가 학습 중이면 끝난 뒤 다시 확인
+                with self._lock:
+                    self._dirty.add(user_id)
+                continue
+            new_samples = self.count_new_samples(user_id)
+            if new_samples >= self.threshold:
+                with self._lock:
+                    if user_id not in self._pending and user_id not in self._running:
+                        self._pending[user_id] = time.time()
+                        logger.info(f"자동 재학습 대기열 추가: {user_id} (새 샘플 {new_samples}개)")
+
+        self._dispatch()
+
+    def count_new_samples(self, user_id: str) -> int:
+        """마지막 모델 학습 이후 추가/변경된 샘플 수 (모델이 없으면 0)"""
+        model_dir = self.base_dir / user_id / "model"
+        state = load_train_state(str(model_dir))
+        if state is None or not (model_dir / "G_latest.pth").exists():
+            return 0
+
+        entries = self.sample_index.entries(self.base_dir / user_id / "samples", analyze=False)
+        trained = set(state.get("sample_hashes", []))
+        return sum(1 for entry in entries if entry["sha256"] not in trained)
+
+    def _dispatch(self):
+        with self._lock:
+            if not self._pending or len(self._running) >= RETRAIN_MAX_RUNNING:
+                return
+        if not self._within_budget():
+            return
+
+        submitted = []
+        with self._lock:
+            # 오래 기다린 사용자부터 제출
+            available = RETRAIN_MAX_RUNNING - len(self._running)
+            users = sorted(self._pending, key=self._pending.get)[:available]
+            for user_id in users:
+                del self._pending[user_id]
+                job = get_job_queue().submit("train", self._retrain, user_id, user_id=user_id)
+                self._running[user_id] = job.id
+                submitted.append((user_id, job))
+
+        for user_id, job in submitted:
+            logger.info(f"자동 재학습 제출: {user_id} (작업 {job.id})")
+            job.future.add_done_callback(lambda future, user_id=user_id: self._finished(user_id, future))
+
+    def _retrain(self, user_id: str, progress: Optional[ProgressCallback] = None):
+        # 대기하는 사이 다른 프로세스가 먼저 재학습했으면 건너뜀
+        if self.count_new_samples(user_id) < self.threshold:
+            return "건너뜀"
+        return train_user_voice(user_id, progress, wait=False)
+
+    def _finished(self, user_id: str, future):
+        error = future.exception()
+        if isinstance(error, TrainingInProgress):
+            logger.info(f"자동 재학습 보류: {user_id} (다른 학습이 진행 중)")
+            with self._lock:
+                self._running.pop(user_id, None)
+                self._dirty.add(user_id)
+            return
+
+        with self._lock:
+            self._running.pop(user_id, None)
+            if error is None:
+                self._failures.pop(user_id, None)
+            else:
+                attempts = self._failures.get(user_id, {}).get("attempts", 0) + 1
+                delay = RETRAIN_BACKOFF_SECONDS * 2 ** (attempts - 1)
+                self._failures[user_id] = {"attempts": attempts, "retry_at": time.time() + delay}
+
+        if error is not None:
+            if attempts >= RETRAIN_MAX_ATTEMPTS:
+                logger.error(f"자동 재학습 실패: {user_id} ({attempts}회 연속, 새 샘플이 들어올 때까지 중단), 에러: {str(error)}")
+            else:
+                logger.error(f"자동 재학습 실패: {user_id} ({attempts}회 연속, {delay}초 후 재시도), 에러: {str(error)}")
+            return
+
+        # 학습 중에 추가된 샘플이 있을 수 있으므로 다시 확인
+        self.notify(user_id)
+
+    def _backing_off(self, user_id: str, now: float) -> bool:
+        with self._lock:
+            failure = self._failures.get(user_id)
+        return failure is not None and (failure["retry_at"] > now or failure["attempts"] >= RETRAIN_MAX_ATTEMPTS)
+
+    def _within_budget(self) -> bool:
+        if RETRAIN_OFFPEAK_HOURS:
+            start, end = (int(hour) for hour in RETRAIN_OFFPEAK_HOURS.split("-"))
+            hour = time.localtime().tm_hour
+            in_window = start <= hour < end if start <= end else (hour >= start or hour < end)
+            if not in_window:
+                return False
+
+        try:
+            load_per_core = os.getloadavg()[0] / (os.cpu_count() or 1)
+        except OSError:
+            return True
+        return load_per_core <= RETRAIN_MAX_LOAD
+
+
+_scheduler: Optional[RetrainScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_retrain_scheduler() -> RetrainScheduler:
+    """프로세스 전역 자동 재학습 스케줄러 반환"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = RetrainScheduler()
+    return _scheduler
@@ -0,0 +1,171 @@
+import os
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+from app.utils.audio_validator import AudioValidator, AudioAnalysis
+from app.utils.audio_probe import probe_audio
+from app.utils.hashing import file_sha256
+
+logger = logging.getLogger(__name__)
+
+# user_data/<id>/ 아래에 저장되는 샘플 분석 인덱스
+INDEX_FILENAME = "samples_index.json"
+INDEX_VERSION = 1
+
+
+class SampleIndex:
+    """사용자별 음성 샘플 분석 결과 인덱스
+
+    샘플 저장 시 길이, 품질 점수, 음성 구간 통계, 파일 해시를 기록하고
+    목록/학습 상태 조회는 이 인덱스만 읽습니다. 파일의 mtime 이나 크기가
+    바뀐 항목은 무효화되어 다음 조회 때 다시 분석됩니다.
+    """
+
+    def __init__(self, validator: Optional[AudioValidator] = None):
+        self.validator = validator or AudioValidator()
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def entries(self, samples_dir: Path, analyze: bool = True) -> List[Dict]:
+        """샘플 디렉토리의 모든 WAV에 대한 인덱스 항목 반환
+
+        analyze=False 이면 인덱스에 없는 샘플을 헤더 정보만으로 채워
+        디코딩 없이 길이만 필요한 조회(학습 요구사항 확인 등)에 사용합니다.
+        """
+        samples_dir = Path(samples_dir)
+        if not samples_dir.exists():
+            return []
+
+        with self._lock_for(samples_dir):
+            index = self._load(samples_dir)
+            changed = False
+            current = {}
+
+            for sample_path in samples_dir.glob("*.wav"):
+                entry = index.get(sample_path.name)
+                if not self._is_fresh(entry, sample_path) or (analyze and not entry.get("analyzed")):
+                    try:
+                        entry = self._build_entry(sample_path, analyze=analyze)
+                    except Exception as e:
+                        logger.error(f"샘플 인덱싱 실패: {sample_path}, 에러: {str(e)}")
+                        continue
+                    changed = True
+                current[sample_path.name] = entry
+
+            if changed or len(current) != len(index):
+                self._save(samples_dir, current)
+
+        return list(current.values())
+
+    def record(self, sample_path: str, analysis: AudioAnalysis):
+        """이미 계산된 분석 결과로 샘플 항목 기록 (샘플 저장 직후 호출)"""
+        sample_path = Path(sample_path)
+        samples_dir = sample_path.parent
+        entry = self._entry_from_analysis(sample_path, analysis)
+
+        with self._lock_for(samples_dir):
+            index = self._load(samples_dir)
+            index[sample_path.name] = entry
+            self._save(samples_dir, index)
+
+    def forget(self, sample_path: str):
+        """삭제된 샘플 항목 제거"""
+        sample_path = Path(sample_path)
+        samples_dir = sample_path.parent
+
+        with self._lock_for(samples_dir):
+            index = self._load(samples_dir)
+            if index.pop(sample_path.name, None) is not None:
+                self._save(samples_dir, index)
+
+    def _build_entry(self, sample_path: Path, analyze: bool) -> Dict:
+        if analyze:
+            return self._entry_from_analysis(sample_path, self.validator.analyze(str(sample_path)))
+
+        info = probe_audio(str(sample_path))
+        entry = self._file_fields(sample_path)
+        entry.update({
+            "duration": info.duration,
+            "sample_rate": info.sample_rate,
+            "analyzed": False
+        })
+        return entry
+
+    def _entry_from_analysis(self, sample_path: Path, analysis: AudioAnalysis) -> Dict:
+        segment_seconds = [
+            (end - start) / analysis.sample_rate for start, end in analysis.voice_segments
+        ]
+        entry = self._file_fields(sample_path)
+        entry.update({
+            "duration": analysis.duration,
+            "sample_rate": analysis.sample_rate,
+            "quality": float(analysis.quality_score),
+            "noise_level": float(analysis.noise_level),
+            "voice_segments": len(segment_seconds),
+            "voiced_seconds": float(sum(segment_seconds)),
+            "mean_segment_seconds": float(sum(segment_seconds) / len(segment_seconds)) if segment_seconds else 0.0,
+            "analyzed": True
+        })
+        return entry
+
+    def _file_fields(self, sample_path: Path) -> Dict:
+        stat = sample_path.stat()
+        return {
+            "filename": sample_path.name,
+            "path": str(sample_path),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "sha256": file_sha256(str(sample_path)),
+            "indexed_at": time.time()
+        }
+
+    def _is_fresh(self, entry: Optional[Dict], sample_path: Path) -> bool:
+        if not entry:
+            return False
+        stat = sample_path.stat()
+        return entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime
+
+    def _index_path(self, samples_dir: Path) -> Path:
+        return samples_dir.parent / INDEX_FILENAME
+
+    def _load(self, samples_dir: Path) -> Dict[str, Dict]:
+        try:
+            with self._index_path(samples_dir).open("r") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        if data.get("version") != INDEX_VERSION:
+            return {}
+        return data.get("samples", {})
+
+    def _save(self, samples_dir: Path, samples: Dict[str, Dict]):
+        # 임시 파일에 쓴 뒤 교체해 중간에 읽어도 깨진 인덱스가 보이지 않게 함
+        index_path = self._index_path(samples_dir)
+        tmp_path = index_path.with_name(f".{index_path.name}.{os.getpid()}.tmp")
+        with tmp_path.open("w") as f:
+            json.dump({"version": INDEX_VERSION, "samples": samples}, f)
+        os.replace(tmp_path, index_path)
+
+    def _lock_for(self, samples_dir: Path) -> threading.Lock:
+        key = str(Path(samples_dir).resolve())
+        with self._locks_guard:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+
+_index: Optional[SampleIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_sample_index() -> SampleIndex:
+    """프로세스 전역 샘플 인덱스 반환"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SampleIndex()
+    return _index
@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+SEPARATION_CACHE_DIR = os.getenv("SEPARATION_CACHE_DIR", "separation_cache")
+# 캐시 디스크 예산 (바이트), 0이면 캐시 비활성화
+SEPARATION_CACHE_MAX_BYTES = int(os.getenv("SEPARATION_CACHE_MAX_BYTES", str(20 * 1024 ** 3)))
+
+META_FILE = "meta.json"
+
+
+class SeparationCache:
+    """입력 오디오 해시 + 모델/파라미터로 키를 만드는 분리 결과 캐시
+
+    항목마다 디렉토리 하나(<키>/vocals.wav, no_vocals.wav, meta.json)를 사용하고,
+    meta.json 의 수정 시각을 마지막 사용 시각으로 삼아 LRU 방식으로 정리합니다.
+    중앙 인덱스가 없으므로 여러 워커 프로세스가 같은 디렉토리를 공유해도 됩니다.
+    """
+
+    def __init__(self, cache_dir: str = SEPARATION_CACHE_DIR, max_bytes: int = SEPARATION_CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(input_hash: str, model_name: str, params: Dict) -> str:
+        """입력 해시, 모델명, 분리 파라미터로 캐시 키 생성"""
+        payload = json.dumps(
+            {"input": input_hash, "model": model_name, "params": params},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, str]]:
+        """캐시 적중 시 보컬/반주 경로 반환"""
+        if not self.enabled:
+            return None
+
+        entry_dir = self.cache_dir / key
+        meta_path = entry_dir / META_FILE
+        try:
+            with meta_path.open("r") as f:
+                meta = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+        result = {
+            "vocals": str(entry_dir / meta["vocals"]),
+            "accompaniment": str(entry_dir / meta["accompaniment"])
+        }
+        if not all(os.path.exists(path) for path in result.values()):
+            self._remove_entry(entry_dir)
+            return None
+
+        # 마지막 사용 시각 갱신 (LRU)
+        os.utime(meta_path, None)
+        return result
+
+    def put(self, key: str, vocals_path: str, accompaniment_path: str) -> Dict[str, str]:
+        """분리 결과를 캐시로 이동시키고 캐시 내 경로 반환"""
+        if not self.enabled:
+            return {"vocals": vocals_path, "accompaniment": accompaniment_path}
+
+        entry_dir = self.cache_dir / key
+        staging_dir = self.cache_dir / f".staging-{key}-{os.getpid()}-{threading.get_ident()}"
+        staging_dir.mkdir(parents=True, exist_ok=True)
+
+        meta = {
+            "vocals": os.path.basename(vocals_path),
+            "accompaniment": os.path.basename(accompaniment_path),
+            "created_at": time.time()
+        }
+        shutil.move(vocals_path, staging_dir / meta["vocals"])
+        shutil.move(accompaniment_path, staging_dir / meta["accompaniment"])
+        with (staging_dir / META_FILE).open("w") as f:
+            json.dump(meta, f)
+
+        with self._lock:
+            try:
+                # 디렉토리 단위로 교체해 다른 요청이 반쯤 만들어진 항목을 읽지 않도록 함
+                os.rename(staging_dir, entry_dir)
+            except OSError:
+                # 동시에 같은 입력을 분리한 다른 요청이 먼저 저장한 경우
+                shutil.rmtree(staging_dir, ignore_errors=True)
+            self._evict(keep=key)
+
+        return self.get(key) or {
+            "vocals": str(entry_dir / meta["vocals"]),
+            "accompaniment": str(entry_dir / meta["accompaniment"])
+        }
+
+    def _evict(self, keep: str):
+        """디스크 예산을 넘으면 가장 오래 사용되지 않은 항목부터 삭제"""
+        entries = []
+        total_size = 0
+        for entry_dir in self.cache_dir.iterdir():
+            meta_path = entry_dir / META_FILE
+            if entry_dir.name.startswith(".") or not meta_path.exists():
+                continue
+            size = sum(f.stat().st_size for f in entry_dir.iterdir() if f.is_file())
+            entries.append((meta_path.stat().st_mtime, size, entry_dir))
+            total_size += size
+
+        for _, size, entry_dir in sorted(entries, key=lambda e: e[0]):
+            if total_size <= self.max_bytes:
+                break
+            if entry_dir.name == keep:
+                continue
+            self._remove_entry(entry_dir)
+            total_size -= size
+            logger.info(f"분리 캐시 항목 삭제 (LRU): {entry_dir.name}")
+
+    def _remove_entry(self, entry_dir: Path):
+        shutil.rmtree(entry_dir, ignore_errors=True)
+
+
+_cache: Optional[SeparationCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_separation_cache() -> SeparationCache:
+    """프로세스 전역 분리 캐시 반환"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SeparationCache()
+    return _cache
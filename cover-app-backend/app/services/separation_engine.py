@@ -0,0 +1,196 @@
+import os
+import time
+import inspect
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Optional
+import numpy as np
+from app.services.progress import ProgressCallback
+from app.utils.stem_format import STEM_EXTENSION, write_stem
+
+logger = logging.getLogger(__name__)
+
+# 환경 변수 기반 demucs 설정
+DEMUCS_MODEL_NAME = os.getenv("DEMUCS_MODEL", "htdemucs")
+DEMUCS_DEVICE = os.getenv("DEMUCS_DEVICE", "cpu")
+DEMUCS_SHIFTS = int(os.getenv("DEMUCS_SHIFTS", "1"))
+DEMUCS_OVERLAP = float(os.getenv("DEMUCS_OVERLAP", "0.25"))
+# 0이면 torch 기본 스레드 수 사용
+DEMUCS_THREADS = int(os.getenv("DEMUCS_THREADS", "0"))
+
+
+class SeparationEngine:
+    """demucs 모델을 워커 프로세스당 한 번만 로드해 상주시키는 분리 엔진"""
+
+    def __init__(self, model_name: str = DEMUCS_MODEL_NAME, device: str = DEMUCS_DEVICE):
+        self.model_name = model_name
+        self.device = device
+        self._model = None
+        self._load_lock = threading.Lock()
+        # 모델을 공유하므로 분리는 전용 단일 스레드 실행기에서만 수행
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="demucs")
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+
+    def load(self):
+        """모델 로드 (이미 로드되어 있으면 재사용)"""
+        if self._model is not None:
+            return self._model
+
+        with self._load_lock:
+            if self._model is None:
+                import torch
+                from demucs.pretrained import get_model
+
+                if DEMUCS_THREADS > 0:
+                    torch.set_num_threads(DEMUCS_THREADS)
+
+                started = time.monotonic()
+                model = get_model(self.model_name)
+                model.to(self.device)
+                model.eval()
+                self._model = model
+                logger.info(f"demucs 모델 로드 완료: {self.model_name} ({time.monotonic() - started:.1f}초)")
+
+        return self._model
+
+    def warmup(self) -> Future:
+        """전용 실행기에서 모델을 미리 로드"""
+        future = self._executor.submit(self.load)
+        future.add_done_callback(self._log_warmup_result)
+        return future
+
+    def separate(
+        self,
+        input_path: str,
+        output_dir: str,
+        progress: Optional[ProgressCallback] = None,
+        source_hash: str = ""
+    ) -> Dict[str, str]:
+        """보컬/반주 분리 후 결과 스템(.f32stem) 경로 반환 (완료될 때까지 대기)"""
+        return self._executor.submit(self._separate, input_path, output_dir, progress, source_hash).result()
+
+    def separate_arrays(self, input_path: str, progress: Optional[ProgressCallback] = None) -> Dict:
+        """보컬/반주 분리 후 파일로 저장하지 않고 (프레임, 채널) float32 배열로 반환"""
+        return self._executor.submit(self._separate_arrays, input_path, progress).result()
+
+    def _separate(
+        self,
+        input_path: str,
+        output_dir: str,
+        progress: Optional[ProgressCallback] = None,
+        source_hash: str = ""
+    ) -> Dict[str, str]:
+        model = self.load()
+        vocals, accompaniment = self._separate_sources(input_path, progress)
+
+        # 후속 단계가 디코딩 없이 memmap 으로 읽도록 float32 스템으로 저장
+        os.makedirs(output_dir, exist_ok=True)
+        vocals_path = os.path.join(output_dir, f"vocals{STEM_EXTENSION}")
+        accompaniment_path = os.path.join(output_dir, f"no_vocals{STEM_EXTENSION}")
+        write_stem(vocals_path, _to_frames(vocals), model.samplerate, source_hash)
+        write_stem(accompaniment_path, _to_frames(accompaniment), model.samplerate, source_hash)
+        if progress is not None:
+            progress("separate", 1.0)
+
+        return {
+            "vocals": vocals_path,
+            "accompaniment": accompaniment_path
+        }
+
+    def _separate_arrays(self, input_path: str, progress: Optional[ProgressCallback] = None) -> Dict:
+        model = self.load()
+        vocals, accompaniment = self._separate_sources(input_path, progress)
+        if progress is not None:
+            progress("separate", 1.0)
+
+        return {
+            "vocals": _to_frames(vocals),
+            "accompaniment": _to_frames(accompaniment),
+            "sample_rate": model.samplerate
+        }
+
+    def _separate_sources(self, input_path: str, progress: Optional[ProgressCallback] = None):
+        """(보컬, 반주) 텐서 반환, 각각 (채널, 샘플)"""
+        import torch
+        from demucs.apply import apply_model
+        from demucs.audio import AudioFile
+
+        model = self.load()
+
+        wav = AudioFile(input_path).read(
+            streams=0,
+            samplerate=model.samplerate,
+            channels=model.audio_channels
+        )
+
+        # demucs CLI와 동일한 정규화
+        ref = wav.mean(0)
+        mean, std = ref.mean(), ref.std() + 1e-8
+        wav = (wav - mean) / std
+
+        apply_kwargs = {}
+        if progress is not None:
+            # 세그먼트 콜백은 demucs 4.1 이상에서만 지원
+            if "callback" in inspect.signature(apply_model).parameters:
+                apply_kwargs["callback"] = _segment_callback(model, progress)
+            progress("separate", 0.0)
+
+        with torch.no_grad():
+            sources = apply_model(
+                model, wav[None],
+                device=self.device,
+                shifts=DEMUCS_SHIFTS,
+                split=True,
+                overlap=DEMUCS_OVERLAP,
+                progress=False,
+                **apply_kwargs
+            )[0]
+        sources = sources * std + mean
+
+        # --two-stems vocals 와 동일하게 보컬 외 스템을 합쳐 반주 생성
+        vocals = sources[model.sources.index("vocals")]
+        accompaniment = sources.sum(0) - vocals
+        return vocals, accompaniment
+
+    def _log_warmup_result(self, future: Future):
+        error = future.exception()
+        if error is not None:
+            logger.warning(f"demucs 모델 사전 로드 실패 (CLI 방식으로 대체됩니다): {str(error)}")
+
+
+def _to_frames(source) -> np.ndarray:
+    """(채널, 샘플) 텐서를 (프레임, 채널) float32 배열로 변환"""
+    return np.ascontiguousarray(source.cpu().numpy().T, dtype=np.float32)
+
+
+def _segment_callback(model, progress: ProgressCallback):
+    """apply_model 세그먼트 콜백을 전체 진행률(모델 × shift × 세그먼트)로 변환"""
+    num_models = len(getattr(model, "models", [model]))
+    total_passes = num_models * max(1, DEMUCS_SHIFTS)
+
+    def callback(info: Dict):
+        if info.get("state") != "end" or not info.get("audio_length"):
+            return
+        done_passes = info.get("model_idx_in_bag", 0) * max(1, DEMUCS_SHIFTS) + info.get("shift_idx", 0)
+        segment_fraction = min(1.0, info["segment_offset"] / info["audio_length"])
+        progress("separate", min(0.99, (done_passes + segment_fraction) / total_passes))
+
+    return callback
+
+
+_engine: Optional[SeparationEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_separation_engine() -> SeparationEngine:
+    """프로세스 전역 분리 엔진 반환"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = SeparationEngine()
+    return _engine
@@ -1,20 +1,180 @@
 import os
 import subprocess
 import uuid
+import shutil
+import logging
+from typing import Optional
+from app.services.progress import ProgressCallback
+from app.services.separation_engine import (
+    get_separation_engine, DEMUCS_MODEL_NAME, DEMUCS_SHIFTS, DEMUCS_OVERLAP
+)
+from app.services.separation_cache import get_separation_cache
+from app.utils.hashing import file_sha256
+from app.utils.stem_format import STEM_EXTENSION, write_stem, read_audio, is_stem, export_wav
 
 DEMUC_OUTPUT_DIR = "demucs_output"
+# "engine": 상주 demucs 엔진 사용 (실패 시 CLI로 대체), "cli": 항상 demucs CLI 실행
+SEPARATION_BACKEND = os.getenv("SEPARATION_BACKEND", "engine")
 
-def separate_audio(input_path: str) -> dict:
+logger = logging.getLogger(__name__)
+
+# 인프로세스 엔진을 사용할 수 없는 환경(demucs 미설치 등)이면 이후 요청은 바로 CLI 사용
+_engine_available = True
+
+def separate_audio(input_path: str, progress: Optional[ProgressCallback] = None) -> dict:
     if not os.path.exists(DEMUC_OUTPUT_DIR):
         os.makedirs(DEMUC_OUTPUT_DIR)
 
+    # 같은 음원 + 같은 모델/파라미터면 이전 분리 결과 재사용
+    source_hash = file_sha256(input_path)
+    cache = get_separation_cache()
+    cache_key = None
+    if cache.enabled:
+        cache_key = cache.make_key(source_hash, DEMUCS_MODEL_NAME, _separation_params())
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"분리 캐시 적중: {input_path}")
+            if progress:
+                progress("separate", 1.0, cached=True)
+            return cached
+
     session_id = str(uuid.uuid4())[:8]
     output_dir = os.path.join(DEMUC_OUTPUT_DIR, session_id)
 
+    result = None
+    if SEPARATION_BACKEND == "engine" and _engine_available:
+        result = _separate_with_engine(input_path, output_dir, progress, source_hash)
+    if result is None:
+        result = _wav_to_stems(_separate_with_cli(input_path, output_dir, progress), source_hash)
+
+    if cache_key is None:
+        return result
+
+    cached = cache.put(cache_key, result["vocals"], result["accompaniment"])
+    shutil.rmtree(output_dir, ignore_errors=True)
+    return cached
+
+def separate_audio_for_api(input_path: str, progress: Optional[ProgressCallback] = None) -> dict:
+    """separate_audio 결과를 API 응답용으로 반환
+
+    vocals/accompaniment 는 기존 클라이언트를 위해 WAV 경로로 유지하고, 디코딩 없이 읽을 수 있는
+    내부 스템 경로는 vocals_stem/accompaniment_stem 에 담습니다 (예전 WAV 캐시 항목이면 빈 문자열).
+    """
+    result = separate_audio(input_path, progress)
+    return {
+        "vocals": export_wav(result["vocals"]),
+        "accompaniment": export_wav(result["accompaniment"]),
+        "vocals_stem": result["vocals"] if is_stem(result["vocals"]) else "",
+        "accompaniment_stem": result["accompaniment"] if is_stem(result["accompaniment"]) else ""
+    }
+
+def separate_audio_arrays(input_path: str, progress: Optional[ProgressCallback] = None) -> dict:
+    """separate_audio 와 같지만 결과를 (프레임, 채널) float32 배열로 반환 (파이프라인 단계 간 전달용)
+
+    캐시가 켜져 있으면 결과를 캐시에도 저장하지만, 다음 단계는 저장한 파일을 다시 읽지 않고
+    분리 엔진이 만든 배열을 그대로 받습니다. 캐시 적중 시에는 스템을 memmap 으로 엽니다.
+    """
+    source_hash = file_sha256(input_path)
+    cache = get_separation_cache()
+    cache_key = None
+    if cache.enabled:
+        cache_key = cache.make_key(source_hash, DEMUCS_MODEL_NAME, _separation_params())
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"분리 캐시 적중: {input_path}")
+            if progress:
+                progress("separate", 1.0, cached=True)
+            return _read_stems(cached)
+
+    result = None
+    if SEPARATION_BACKEND == "engine" and _engine_available:
+        result = _separate_arrays_with_engine(input_path, progress)
+    if result is None:
+        # 엔진을 쓸 수 없으면 CLI 결과 파일을 읽음 (캐시 저장은 separate_audio 가 처리)
+        return _read_stems(separate_audio(input_path, progress))
+
+    if cache_key is not None:
+        output_dir = os.path.join(DEMUC_OUTPUT_DIR, str(uuid.uuid4())[:8])
+        os.makedirs(output_dir, exist_ok=True)
+        vocals_path = os.path.join(output_dir, f"vocals{STEM_EXTENSION}")
+        accompaniment_path = os.path.join(output_dir, f"no_vocals{STEM_EXTENSION}")
+        write_stem(vocals_path, result["vocals"], result["sample_rate"], source_hash)
+        write_stem(accompaniment_path, result["accompaniment"], result["sample_rate"], source_hash)
+        cache.put(cache_key, vocals_path, accompaniment_path)
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    return result
+
+def _read_stems(paths: dict) -> dict:
+    # 스템은 memmap 으로 열고, 이전 버전 캐시에 남은 WAV 만 디코딩
+    vocals, sample_rate = read_audio(paths["vocals"])
+    accompaniment, accompaniment_rate = read_audio(paths["accompaniment"])
+    if accompaniment_rate != sample_rate:
+        raise RuntimeError(f"보컬/반주 샘플레이트가 다릅니다: {sample_rate}, {accompaniment_rate}")
+    return {"vocals": vocals, "accompaniment": accompaniment, "sample_rate": sample_rate}
+
+def _separation_params() -> dict:
+    """캐시 키에 포함되는 분리 파라미터"""
+    return {
+        "stems": "vocals",
+        "shifts": DEMUCS_SHIFTS,
+        "overlap": DEMUCS_OVERLAP
+    }
+
+def _wav_to_stems(paths: dict, source_hash: str) -> dict:
+    """CLI 가 만든 WAV 를 한 번만 디코딩해 스템으로 변환 (후속 단계는 디코딩 없이 읽음)"""
+    stems = {}
+    for name, path in paths.items():
+        audio, sample_rate = read_audio(path)
+        stems[name] = write_stem(os.path.splitext(path)[0] + STEM_EXTENSION, audio, sample_rate, source_hash)
+        os.remove(path)
+    return stems
+
+def _separate_with_engine(
+    input_path: str,
+    output_dir: str,
+    progress: Optional[ProgressCallback] = None,
+    source_hash: str = ""
+):
+    global _engine_available
+
+    engine = get_separation_engine()
+    song_name = os.path.splitext(os.path.basename(input_path))[0]
+    # CLI와 동일한 폴더 구조 유지: demucs_output/<session_id>/<모델명>/<파일명>/
+    stem_dir = os.path.join(output_dir, engine.model_name, song_name)
+
+    try:
+        return engine.separate(input_path, stem_dir, progress, source_hash)
+    except ImportError as e:
+        _engine_available = False
+        logger.warning(f"demucs 엔진을 사용할 수 없어 CLI로 대체합니다: {str(e)}")
+    except Exception as e:
+        logger.error(f"demucs 엔진 분리 실패, CLI로 재시도합니다: {str(e)}")
+    return None
+
+def _separate_arrays_with_engine(input_path: str, progress: Optional[ProgressCallback] = None):
+    global _engine_available
+
+    try:
+        return get_separation_engine().separate_arrays(input_path, progress)
+    except ImportError as e:
+        _engine_available = False
+        logger.warning(f"demucs 엔진을 사용할 수 없어 CLI로 대체합니다: {str(e)}")
+    except Exception as e:
+        logger.error(f"demucs 엔진 분리 실패, CLI로 재시도합니다: {str(e)}")
+    return None
+
+def _separate_with_cli(input_path: str, output_dir: str, progress: Optional[ProgressCallback] = None) -> dict:
+    # CLI 는 세그먼트 단위 진행률을 알 수 없으므로 시작/종료만 알림
+    if progress:
+        progress("separate", None, backend="cli")
+
     # demucs 명령어 실행
     try:
         result = subprocess.run([
-            "demucs", "-o", output_dir, input_path
+            "demucs", "-n", DEMUCS_MODEL_NAME, "--two-stems", "vocals",
+            "--shifts", str(DEMUCS_SHIFTS), "--overlap", str(DEMUCS_OVERLAP),
+            "-o", output_dir, input_path
         ], capture_output=True, text=True)
 
         if result.returncode != 0:
@@ -24,7 +184,7 @@ def separate_audio(input_path: str) -> dict:
         song_name = os.path.splitext(os.path.basename(input_path))[0]
         
         # demucs 버전에 따라 폴더 구조가 다를 수 있음
-        possible_prefix = ["htdemucs", "demucs"]
+        possible_prefix = [DEMUCS_MODEL_NAME, "htdemucs", "demucs"]
         stem_dir = None
         
         for prefix in possible_prefix:
@@ -52,6 +212,9 @@ def separate_audio(input_path: str) -> dict:
         if other_path is None:
             other_path = os.path.join(stem_dir, "no_vocals.wav")  # 기본값
 
+        if progress:
+            progress("separate", 1.0, backend="cli")
+
         return {
             "vocals": vocals_path,
             "accompaniment": other_path
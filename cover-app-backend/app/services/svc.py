@@ -1,15 +1,136 @@
 import subprocess
 import os
 import uuid
+import shutil
+import logging
+import tempfile
+from typing import Dict, Optional, Tuple
+import numpy as np
+from app.services.progress import ProgressCallback
+from app.services.svc_engine import get_svc_service
+from app.utils.stem_format import STEM_EXTENSION, is_stem, read_stem_info, read_audio, write_stem, export_stem, export_wav
 
-def convert_vocals_with_svc(input_path: str, user_id: str) -> str:
+# "engine": 상주 추론 서비스 사용 (실패 시 CLI로 대체), "cli": 항상 inference_main.py 실행
+SVC_BACKEND = os.getenv("SVC_BACKEND", "engine")
+
+logger = logging.getLogger(__name__)
+
+# so-vits-svc 를 프로세스 안에서 불러올 수 없는 환경이면 이후 요청은 바로 CLI 사용
+_engine_available = True
+
+def convert_vocals_with_svc(input_path: str, user_id: str, progress: Optional[ProgressCallback] = None) -> str:
     # 출력 디렉토리 생성
     os.makedirs("converted", exist_ok=True)
     session_id = str(uuid.uuid4())[:8]
-    output_path = f"converted/converted_{session_id}.wav"
+    # 믹서가 디코딩 없이 읽도록 변환 결과는 스템으로 저장
+    output_path = f"converted/converted_{session_id}{STEM_EXTENSION}"
+    
+    if SVC_BACKEND == "engine" and _engine_available:
+        converted = _convert_with_engine(input_path, user_id, output_path, progress)
+        if converted is not None:
+            return converted
     
-    # 유저 모델 경로 지정
-    model_dir = f"user_data/{user_id}/model"
+    if progress:
+        progress("convert", None, backend="cli")
+    converted = _convert_stem_with_cli(input_path, user_id, output_path)
+    if progress:
+        progress("convert", 1.0, backend="cli")
+    return converted
+
+def convert_vocals_for_api(input_path: str, user_id: str, progress: Optional[ProgressCallback] = None) -> Dict[str, str]:
+    """convert_vocals_with_svc 결과를 API 응답용으로 반환 (output_path 는 기존과 같이 WAV, 스템은 output_stem_path)"""
+    converted = convert_vocals_with_svc(input_path, user_id, progress)
+    return {"output_path": export_wav(converted), "output_stem_path": converted}
+
+def convert_vocals_array(
+    audio: np.ndarray,
+    sample_rate: int,
+    user_id: str,
+    transpose: int = 0,
+    progress: Optional[ProgressCallback] = None
+) -> Tuple[np.ndarray, int]:
+    """보컬 배열((프레임,) 또는 (프레임, 채널))을 변환해 (모노 배열, 샘플레이트) 반환 (파이프라인 단계 간 전달용)"""
+    if audio.ndim == 2:
+        audio = audio.mean(axis=1)
+    audio = np.ascontiguousarray(audio, dtype=np.float32)
+
+    if SVC_BACKEND == "engine" and _engine_available:
+        converted = _convert_array_with_engine(audio, sample_rate, user_id, transpose, progress)
+        if converted is not None:
+            return converted
+
+    # CLI 는 파일 입출력만 지원하므로 임시 파일을 거침
+    import soundfile as sf
+
+    temp_dir = tempfile.mkdtemp(prefix="svc-")
+    try:
+        input_path = os.path.join(temp_dir, "vocals.wav")
+        output_path = os.path.join(temp_dir, "converted.wav")
+        sf.write(input_path, audio, sample_rate, subtype="FLOAT")
+        if progress:
+            progress("convert", None, backend="cli")
+        _convert_with_cli(input_path, user_id, output_path)
+        if progress:
+            progress("convert", 1.0, backend="cli")
+        converted, converted_rate = sf.read(output_path, dtype="float32")
+        return converted, converted_rate
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def _convert_array_with_engine(
+    audio: np.ndarray,
+    sample_rate: int,
+    user_id: str,
+    transpose: int = 0,
+    progress: Optional[ProgressCallback] = None
+):
+    global _engine_available
+
+    try:
+        service = get_svc_service()
+        target_rate = service.get_model(user_id).target_sample
+        converted = service.convert_array(user_id, audio, sample_rate, transpose=transpose, progress=progress)
+        return converted, target_rate
+    except ImportError as e:
+        _engine_available = False
+        logger.warning(f"SVC 추론 서비스를 사용할 수 없어 CLI로 대체합니다: {str(e)}")
+    except FileNotFoundError:
+        raise
+    except Exception as e:
+        logger.error(f"SVC 추론 서비스 변환 실패, CLI로 재시도합니다: {str(e)}")
+    return None
+
+def _convert_with_engine(input_path: str, user_id: str, output_path: str, progress: Optional[ProgressCallback] = None):
+    global _engine_available
+    
+    try:
+        return get_svc_service().convert_file(user_id, input_path, output_path, progress=progress)
+    except ImportError as e:
+        _engine_available = False
+        logger.warning(f"SVC 추론 서비스를 사용할 수 없어 CLI로 대체합니다: {str(e)}")
+    except FileNotFoundError:
+        raise
+    except Exception as e:
+        logger.error(f"SVC 추론 서비스 변환 실패, CLI로 재시도합니다: {str(e)}")
+    return None
+
+def _convert_stem_with_cli(input_path: str, user_id: str, output_path: str) -> str:
+    """CLI 는 WAV 입출력만 지원하므로 임시 WAV 를 거쳐 변환하고 결과를 스템으로 저장"""
+    temp_dir = tempfile.mkdtemp(prefix="svc-")
+    try:
+        source_hash = ""
+        if is_stem(input_path):
+            source_hash = read_stem_info(input_path).source_hash
+            input_path = export_stem(input_path, os.path.join(temp_dir, "vocals.wav"))
+        wav_path = _convert_with_cli(input_path, user_id, os.path.join(temp_dir, "converted.wav"))
+        audio, sample_rate = read_audio(wav_path)
+        return write_stem(output_path, audio, sample_rate, source_hash)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def _convert_with_cli(input_path: str, user_id: str, output_path: str) -> str:
+    # 유저 모델 경로 지정 (학습 중 교체되어도 같은 버전의 파일을 쓰도록 링크를 한 번만 풂)
+    model_dir = os.path.realpath(f"user_data/{user_id}/model")
     
     # SVC 모델 실행 명령어
     command = [
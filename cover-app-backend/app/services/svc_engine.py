@@ -0,0 +1,353 @@
+import io
+import os
+import gc
+import sys
+import time
+import inspect
+import logging
+import importlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Optional, Tuple
+import numpy as np
+from app.utils.vocal_slicer import find_voiced_slices, overlap_add
+from app.services.progress import ProgressCallback
+from app.services.job_queue import STAGE_CONCURRENCY
+from app.utils.stem_format import is_stem, read_stem_info, read_audio, write_stem
+
+logger = logging.getLogger(__name__)
+
+SVC_DIR = os.getenv("SVC_DIR", "so-vits-svc")
+SVC_DEVICE = os.getenv("SVC_DEVICE", "cpu")
+# 사용자 모델 LRU가 차지할 수 있는 최대 메모리 (바이트)
+SVC_MODEL_CACHE_BYTES = int(os.getenv("SVC_MODEL_CACHE_BYTES", str(2 * 1024 ** 3)))
+# 무음 구간 검출 기준 (최대 음량 대비 dB)
+SVC_VAD_TOP_DB = float(os.getenv("SVC_VAD_TOP_DB", "40"))
+# 유성 구간 조각 최대 길이 (초)
+SVC_MAX_SLICE_SECONDS = float(os.getenv("SVC_MAX_SLICE_SECONDS", "30"))
+# 조각을 병렬 변환하는 스레드 수
+SVC_SLICE_WORKERS = int(os.getenv("SVC_SLICE_WORKERS", str(min(4, os.cpu_count() or 1))))
+# 조각 변환 스레드 하나가 쓰는 torch 스레드 수 (0이면 코어 수를 동시 변환 수 × 조각 스레드 수로 나눔)
+SVC_THREADS_PER_SLICE = int(os.getenv("SVC_THREADS_PER_SLICE", "0"))
+SVC_CLUSTER_RATIO = float(os.getenv("SVC_CLUSTER_RATIO", "0.5"))
+SVC_NOISE_SCALE = float(os.getenv("SVC_NOISE_SCALE", "0.4"))
+
+# 4.0 의 get_hubert_model 이 함수 안에 고정해 둔 가중치 경로
+LEGACY_HUBERT_PATH = "hubert/checkpoint_best_legacy_500.pt"
+# 4.1 get_speech_encoder 의 인코더 이름 → vencoder 모듈/클래스 이름 (모듈과 클래스 이름이 같음)
+SPEECH_ENCODER_CLASSES = {
+    "vec768l12": "ContentVec768L12",
+    "vec256l9": "ContentVec256L9",
+    "vec256l9-onnx": "ContentVec256L9_Onnx",
+    "vec256l12-onnx": "ContentVec256L12_Onnx",
+    "vec768l9-onnx": "ContentVec768L9_Onnx",
+    "vec768l12-onnx": "ContentVec768L12_Onnx",
+    "hubertsoft-onnx": "HubertSoft_Onnx",
+    "hubertsoft": "HubertSoft",
+    "whisper-ppg": "WhisperPPG",
+    "cnhubertlarge": "CNHubertLarge",
+    "dphubert": "DPHubert",
+    "whisper-ppg-large": "WhisperPPGLarge",
+    "wavlmbase+": "WavLMBasePlus",
+}
+
+
+class _LoadedModel:
+    def __init__(self, svc, signature: Tuple, size_bytes: int):
+        self.svc = svc
+        self.signature = signature
+        self.size_bytes = size_bytes
+
+
+class SvcInferenceService:
+    """so-vits-svc 상주 추론 서비스
+
+    HuBERT/ContentVec 특징 추출기는 프로세스당 한 번만 로드해 모든 사용자가 공유하고,
+    사용자별 생성기(G_latest.pth)와 클러스터 모델(kmeans.pt)은 메모리 예산 안에서 LRU로 유지합니다.
+    user_data/<id>/model 의 파일이 바뀌면 다음 요청에서 다시 로드합니다.
+    """
+
+    def __init__(self, max_cache_bytes: int = SVC_MODEL_CACHE_BYTES, device: str = SVC_DEVICE):
+        self.max_cache_bytes = max_cache_bytes
+        self.device = device
+        self._models: "OrderedDict[str, _LoadedModel]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._user_locks: Dict[str, threading.Lock] = {}
+        self._svc_class = None
+        self._import_lock = threading.Lock()
+        self._shared_encoders: Dict[Tuple, object] = {}
+        self._encoder_lock = threading.Lock()
+
+    def convert_file(
+        self,
+        user_id: str,
+        input_path: str,
+        output_path: str,
+        transpose: int = 0,
+        progress: Optional[ProgressCallback] = None
+    ) -> str:
+        """입력 보컬 파일을 사용자 음색으로 변환해 저장 (출력 경로가 .f32stem 이면 스템으로 저장)"""
+        svc = self.get_model(user_id)
+        source_hash = ""
+        if is_stem(input_path):
+            # 분리 결과 스템은 디코딩 없이 memmap 으로 읽음 (샘플레이트가 다르면 convert_array 에서 리샘플링)
+            audio, sr = read_audio(input_path, mono=True)
+            source_hash = read_stem_info(input_path).source_hash
+        else:
+            import librosa
+            audio, sr = librosa.load(input_path, sr=svc.target_sample)
+
+        converted = self.convert_array(user_id, audio, sr, transpose=transpose, progress=progress)
+        if is_stem(output_path):
+            write_stem(output_path, converted, svc.target_sample, source_hash)
+        else:
+            import soundfile as sf
+            sf.write(output_path, converted, svc.target_sample)
+        return output_path
+
+    def convert_array(
+        self,
+        user_id: str,
+        audio: np.ndarray,
+        sr: int,
+        transpose: int = 0,
+        progress: Optional[ProgressCallback] = None
+    ) -> np.ndarray:
+        """모노 보컬 배열 변환 - 무음은 건너뛰고 유성 구간만 병렬 변환 후 크로스페이드로 이어 붙임"""
+        svc = self.get_model(user_id)
+        if sr != svc.target_sample:
+            import librosa
+            audio = librosa.resample(audio, orig_sr=sr, target_sr=svc.target_sample)
+            sr = svc.target_sample
+
+        slices = find_voiced_slices(audio, sr, top_db=SVC_VAD_TOP_DB, max_slice=SVC_MAX_SLICE_SECONDS)
+        output = np.zeros(len(audio), dtype=np.float32)
+        if not slices:
+            if progress:
+                progress("convert", 1.0, slices_done=0, slices_total=0)
+            return output
+
+        voiced = sum(s.end - s.start for s in slices)
+        logger.info(f"SVC 변환: 유성 구간 {len(slices)}개, 전체의 {voiced / len(audio) * 100:.0f}%")
+
+        speaker = self._speaker_for(svc, user_id)
+        with ThreadPoolExecutor(
+            max_workers=max(1, SVC_SLICE_WORKERS),
+            thread_name_prefix="svc-slice",
+            initializer=_limit_torch_threads
+        ) as pool:
+            futures = {
+                pool.submit(self._convert_slice, svc, speaker, audio[s.start:s.end], sr, transpose): s
+                for s in slices
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                overlap_add(output, future.result(), futures[future])
+                if progress:
+                    progress("convert", done / len(slices), slices_done=done, slices_total=len(slices))
+
+        return output
+
+    def _convert_slice(self, svc, speaker: str, audio: np.ndarray, sr: int, transpose: int) -> np.ndarray:
+        import soundfile as sf
+
+        buffer = io.BytesIO()
+        sf.write(buffer, audio, sr, format="WAV")
+        buffer.seek(0)
+
+        result = svc.infer(
+            speaker, transpose, buffer,
+            cluster_infer_ratio=SVC_CLUSTER_RATIO if getattr(svc, "cluster_model", None) else 0,
+            auto_predict_f0=False,
+            noice_scale=SVC_NOISE_SCALE
+        )
+        return result[0].detach().cpu().numpy().astype(np.float32)
+
+    def get_model(self, user_id: str):
+        """사용자 모델 반환 (LRU 적중 시 재사용, 모델 파일이 바뀌었으면 다시 로드)"""
+        paths = self._model_paths(user_id)
+        signature = self._signature(paths)
+
+        with self._user_lock(user_id):
+            with self._lock:
+                loaded = self._models.get(user_id)
+                if loaded is not None and loaded.signature == signature:
+                    self._models.move_to_end(user_id)
+                    return loaded.svc
+
+            if loaded is not None:
+                logger.info(f"모델 파일 변경 감지, 다시 로드합니다: {user_id}")
+
+            loaded = self._load_model(paths, signature)
+            with self._lock:
+                self._models[user_id] = loaded
+                self._models.move_to_end(user_id)
+                self._evict(keep=user_id)
+            return loaded.svc
+
+    def _load_model(self, paths: Dict[str, str], signature: Tuple) -> _LoadedModel:
+        if not os.path.exists(paths["model"]):
+            raise FileNotFoundError(f"학습된 모델이 없습니다: {paths['model']}")
+
+        svc_class = self._import_svc()
+        started = time.monotonic()
+        svc = svc_class(
+            paths["model"],
+            paths["config"],
+            device=self.device,
+            cluster_model_path=paths["cluster"]
+        )
+        size_bytes = sum(
+            tensor.numel() * tensor.element_size()
+            for tensor in svc.net_g_ms.state_dict().values()
+        )
+        if os.path.exists(paths["cluster"]):
+            size_bytes += os.path.getsize(paths["cluster"])
+
+        logger.info(f"SVC 모델 로드 완료: {paths['model']} ({size_bytes / 1024 ** 2:.0f}MB, {time.monotonic() - started:.1f}초)")
+        return _LoadedModel(svc, signature, size_bytes)
+
+    def _evict(self, keep: str):
+        """메모리 예산을 넘으면 가장 오래 사용하지 않은 사용자 모델부터 해제"""
+        total = sum(model.size_bytes for model in self._models.values())
+        for user_id in list(self._models.keys()):
+            if total <= self.max_cache_bytes:
+                break
+            if user_id == keep:
+                continue
+            total -= self._models.pop(user_id).size_bytes
+            logger.info(f"SVC 모델 캐시 해제 (LRU): {user_id}")
+
+        # 캐시에 모델이 없는 사용자의 잠금도 정리 (로드 중이라 잡혀 있는 잠금은 남김)
+        idle = [
+            user_id for user_id, lock in self._user_locks.items()
+            if user_id not in self._models and not lock.locked()
+        ]
+        for user_id in idle:
+            del self._user_locks[user_id]
+        gc.collect()
+
+    def _import_svc(self):
+        # 처음 요청 여러 개가 동시에 들어와도 로더 교체와 sys.path 수정은 한 번만 수행
+        with self._import_lock:
+            if self._svc_class is not None:
+                return self._svc_class
+
+            svc_dir = os.path.abspath(SVC_DIR)
+            if svc_dir not in sys.path:
+                sys.path.insert(0, svc_dir)
+
+            from inference import infer_tool
+
+            # 특징 추출기 로더를 감싸 모든 사용자 모델이 같은 인스턴스를 공유하게 함
+            svc_utils = infer_tool.utils
+            if getattr(svc_utils, "get_hubert_model", None) is not None:
+                svc_utils.get_hubert_model = self._shared_loader(_legacy_hubert_loader(svc_dir))
+            if getattr(svc_utils, "get_speech_encoder", None) is not None:
+                svc_utils.get_speech_encoder = self._shared_loader(
+                    _absolute_encoder_loader(svc_dir, svc_utils.get_speech_encoder)
+                )
+
+            self._svc_class = infer_tool.Svc
+            return self._svc_class
+
+    def _shared_loader(self, loader):
+        def load_shared(*args, **kwargs):
+            key = (loader.__name__, args, tuple(sorted(kwargs.items())))
+            with self._encoder_lock:
+                if key not in self._shared_encoders:
+                    logger.info(f"공유 특징 추출기 로드: {loader.__name__}")
+                    self._shared_encoders[key] = loader(*args, **kwargs)
+                return self._shared_encoders[key]
+        return load_shared
+
+    def _speaker_for(self, svc, user_id: str) -> str:
+        # 화자 이름은 user_id와 동일하게 가정하고, 없으면 모델의 첫 화자 사용
+        if user_id in svc.spk2id:
+            return user_id
+        return next(iter(svc.spk2id))
+
+    def _model_paths(self, user_id: str) -> Dict[str, str]:
+        # model 은 학습이 끝날 때마다 새 버전 디렉토리로 바뀌는 링크이므로, 한 번만 풀어
+        # 세 파일을 모두 같은 버전에서 읽음 (버전이 바뀌면 경로가 달라져 시그니처도 바뀜)
+        model_dir = os.path.realpath(os.path.join("user_data", user_id, "model"))
+        return {
+            "model": os.path.join(model_dir, "G_latest.pth"),
+            "config": os.path.join(model_dir, "config.json"),
+            "cluster": os.path.join(model_dir, "kmeans.pt")
+        }
+
+    def _signature(self, paths: Dict[str, str]) -> Tuple:
+        signature = []
+        for path in paths.values():
+            try:
+                stat = os.stat(path)
+                signature.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _user_lock(self, user_id: str) -> threading.Lock:
+        with self._lock:
+            if user_id not in self._user_locks:
+                self._user_locks[user_id] = threading.Lock()
+            return self._user_locks[user_id]
+
+
+def _slice_threads() -> int:
+    """조각 변환 스레드 하나에 배정되는 torch 스레드 수 (동시 변환 작업과 조각 스레드가 코어를 나눠 씀)"""
+    workers = max(1, STAGE_CONCURRENCY["convert"]) * max(1, SVC_SLICE_WORKERS)
+    return SVC_THREADS_PER_SLICE or max(1, (os.cpu_count() or 1) // workers)
+
+
+def _limit_torch_threads():
+    # OpenMP 빌드에서는 스레드 수가 호출한 스레드에만 적용되므로 조각 스레드마다 설정
+    import torch
+
+    torch.set_num_threads(_slice_threads())
+
+
+def _legacy_hubert_loader(svc_dir: str):
+    """4.0 get_hubert_model 과 같은 로더 (고정 상대 경로 대신 SVC_DIR 기준 절대 경로 사용)"""
+    vec_path = os.path.join(svc_dir, LEGACY_HUBERT_PATH)
+
+    def get_hubert_model():
+        from fairseq import checkpoint_utils
+
+        models, _, _ = checkpoint_utils.load_model_ensemble_and_task([vec_path], suffix="")
+        model = models[0]
+        model.eval()
+        return model
+    return get_hubert_model
+
+
+def _absolute_encoder_loader(svc_dir: str, fallback):
+    """4.1 get_speech_encoder 와 같은 로더 (가중치 경로를 SVC_DIR 기준 절대 경로로 넘김)
+
+    원래 로더는 device 만 넘겨 vencoder 클래스의 기본 경로(pretrain/...)를 작업 디렉토리
+    기준으로 열기 때문에, 같은 클래스를 직접 만들면서 기본 경로를 절대 경로로 바꿔 넘깁니다.
+    목록에 없는 인코더는 원래 로더에 맡깁니다.
+    """
+    def get_speech_encoder(speech_encoder, device=None, **kwargs):
+        class_name = SPEECH_ENCODER_CLASSES.get(speech_encoder)
+        if class_name is None:
+            return fallback(speech_encoder, device=device, **kwargs)
+
+        encoder_class = getattr(importlib.import_module(f"vencoder.{class_name}"), class_name)
+        vec_path = inspect.signature(encoder_class).parameters["vec_path"].default
+        return encoder_class(vec_path=os.path.join(svc_dir, vec_path), device=device)
+    return get_speech_encoder
+
+
+_service: Optional[SvcInferenceService] = None
+_service_lock = threading.Lock()
+
+
+def get_svc_service() -> SvcInferenceService:
+    """프로세스 전역 SVC 추론 서비스 반환"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = SvcInferenceService()
+    return _service
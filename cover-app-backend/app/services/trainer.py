@@ -1,61 +1,642 @@
 import os
+import re
+import json
+import time
+import fcntl
 import subprocess
 import shutil
+import socket
 import logging
+import threading
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.services.progress import ProgressCallback
+from app.services.job_queue import STAGE_CONCURRENCY
+from app.services.sample_index import get_sample_index
+from app.services.feature_cache import get_feature_cache, link_or_copy
+from app.services.clustering import fit_codebook, load_codebooks, save_codebooks, load_features
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 BASE_DIR = "user_data"
-SVC_DIR = "so-vits-svc"
+SVC_DIR = os.getenv("SVC_DIR", "so-vits-svc")
+# 사용자별 학습 작업 공간 (데이터셋, filelist, config, 로그를 사용자마다 분리)
+WORKSPACE_DIR = os.getenv("TRAINING_WORKSPACE_DIR", "training_workspaces")
+# 작업 공간 기준 학습 config 경로 (preprocess_flist_config.py 출력 위치)
+SVC_TRAIN_CONFIG = os.getenv("SVC_TRAIN_CONFIG", "configs/44k/config.json")
+MODEL_NAME = "44k"
+TRAIN_SAMPLE_RATE = 44100
+# 리샘플링/특징 추출 방식이 바뀌면 올려서 캐시를 무효화
+RESAMPLE_VERSION = 1
+FEATURE_EXTRACTOR_VERSION = os.getenv("SVC_FEATURE_EXTRACTOR_VERSION", "1")
+# so-vits-svc 스크립트가 작업 디렉토리 기준 상대 경로로 읽는 공용 자산
+SHARED_ASSETS = ("hubert", "pretrain", "configs_template")
+# 학습 작업 하나가 사용하는 스레드 수 (0이면 코어 수를 동시 학습 수로 나눔)
+TRAIN_THREADS_PER_JOB = int(os.getenv("TRAIN_THREADS_PER_JOB", "0"))
+# 이전 모델 이후 추가된 샘플이 이 수 이하이면 이전 체크포인트에서 이어서 학습
+WARM_START_MAX_NEW_SAMPLES = int(os.getenv("WARM_START_MAX_NEW_SAMPLES", "10"))
+# 이어서 학습할 때 추가로 도는 에폭 수
+WARM_START_EPOCHS = int(os.getenv("WARM_START_EPOCHS", "100"))
+# 모델 디렉토리에 기록하는 학습 상태 (에폭, 스텝, 학습에 쓴 샘플 해시)
+TRAIN_STATE_FILE = "train_state.json"
+# 학습 결과를 버전별로 내보내는 디렉토리 (user_data/<id>/model 은 이 중 하나를 가리키는 링크)
+MODEL_VERSIONS_DIR = "model_versions"
+# 남겨 두는 모델 버전 수 (교체 직전 버전을 불러오던 추론이 끝날 수 있도록 하나 더 보관)
+MODEL_VERSIONS_KEPT = 2
+# 특징 추출 프로세스 수 (0이면 학습 작업의 스레드 수를 워커당 스레드 수로 나눔)
+PREPROCESS_WORKERS = int(os.getenv("PREPROCESS_WORKERS", "0"))
+# 특징 추출 프로세스 하나가 사용하는 torch/BLAS 스레드 수
+PREPROCESS_THREADS_PER_WORKER = int(os.getenv("PREPROCESS_THREADS_PER_WORKER", "2"))
+# preprocess_hubert_f0.py 가 <stem>.wav 옆에 만드는 특징 파일 접미사 (<stem>.<접미사>)
+FEATURE_SUFFIXES = ("wav.soft.pt", "wav.f0.npy", "spec.pt")
+# config 의 model.vol_embedding 이 켜져 있을 때만 만들어지는 음량 특징
+VOLUME_FEATURE_SUFFIX = "wav.vol.npy"
+# 같은 사용자의 학습을 하나로 제한하는 잠금 파일 (user_data/<id>/.train.lock, 워커 프로세스끼리도 공유)
+TRAIN_LOCK_FILENAME = ".train.lock"
+# 학습 로그(train.log)를 확인하는 주기 (초)
+TRAIN_LOG_POLL_SECONDS = float(os.getenv("TRAIN_LOG_POLL_SECONDS", "2"))
 
-def train_user_voice(user_id: str):
-    user_path = os.path.join(BASE_DIR, user_id)
-    sample_dir = os.path.join(SVC_DIR, "dataset_raw", user_id)
+# so-vits-svc train.py 로그 형식: "Train Epoch: 3 [42%]", "Losses: [...], step: 1200, lr: ..."
+EPOCH_PATTERN = re.compile(r"Train Epoch: (\d+) \[(\d+)%\]")
+STEP_PATTERN = re.compile(r"step: (\d+)")
 
-    # 1. 샘플 복사
-    if not os.path.exists(sample_dir):
-        os.makedirs(sample_dir)
-    for f in os.listdir(os.path.join(user_path, "samples")):
-        shutil.copy(os.path.join(user_path, "samples", f), sample_dir)
+class TrainingInProgress(RuntimeError):
+    """같은 사용자의 학습이 이미 (다른 프로세스에서라도) 진행 중"""
 
-    # 2. 리샘플링
-    subprocess.run(["python", "resample.py"], cwd=SVC_DIR)
+def train_user_voice(
+    user_id: str,
+    progress: Optional[ProgressCallback] = None,
+    warm_start: Optional[bool] = None,
+    wait: bool = True
+):
+    """사용자 모델 학습
+
+    warm_start 가 None 이면 저장된 체크포인트와 샘플 변화량을 보고 이어서 학습할지
+    자동으로 결정합니다. False 이면 항상 처음부터 학습합니다.
+    같은 사용자의 학습이 진행 중이면 끝날 때까지 기다리고, wait 가 False 이면
+    기다리지 않고 TrainingInProgress 를 발생시킵니다.
+    """
+    with _user_lock(user_id, wait):
+        return _train_in_workspace(user_id, progress, warm_start)
+
+def is_training(user_id: str) -> bool:
+    """이 프로세스나 다른 워커 프로세스에서 사용자 학습이 진행 중인지 확인"""
+    try:
+        with _user_lock(user_id, wait=False):
+            return False
+    except TrainingInProgress:
+        return True
+
+def prepare_workspace(user_id: str) -> Path:
+    """사용자 작업 공간 생성 - so-vits-svc 디렉토리 구조를 그대로 따름"""
+    workspace = Path(WORKSPACE_DIR) / user_id
+    for sub_dir in (f"dataset/{MODEL_NAME}", "filelists", f"configs/{MODEL_NAME}", f"logs/{MODEL_NAME}"):
+        (workspace / sub_dir).mkdir(parents=True, exist_ok=True)
+
+    svc_dir = Path(SVC_DIR).resolve()
+    for name in SHARED_ASSETS:
+        target = svc_dir / name
+        link = workspace / name
+        if target.exists() and not os.path.lexists(link):
+            os.symlink(target, link, target_is_directory=True)
+
+    return workspace
+
+def _train_in_workspace(user_id: str, progress: Optional[ProgressCallback] = None, warm_start: Optional[bool] = None):
+    workspace = prepare_workspace(user_id)
+    env = _subprocess_env()
+    output_model_path = os.path.join(BASE_DIR, user_id, "model")
+    previous_state = load_train_state(output_model_path)
+
+    # 1~2. 샘플 동기화 + 리샘플링 (캐시에 없는 샘플만 계산)
+    _report(progress, "preprocess", 0 / 4, step="resample")
+    sample_hashes = _prepare_dataset(user_id, workspace)
 
     # 3. config 및 flist 생성
-    subprocess.run(["python", "preprocess_flist_config.py"], cwd=SVC_DIR)
-
-    # 4. 특징 추출
-    subprocess.run(["python", "preprocess_hubert_f0.py"], cwd=SVC_DIR)
-
-    # 5. 클러스터링
-    subprocess.run(["python", "train_cluster.py"], cwd=SVC_DIR)
-
-    # 6. 모델 학습
-    subprocess.run([
-        "python", "train.py",
-        "-c", "configs/44k/config.json",
-        "-m", "44k"
-    ], cwd=SVC_DIR)
-
-    # 7. 모델 복사
-    model_path = os.path.join(SVC_DIR, "logs/44k")
-    output_model_path = os.path.join(user_path, "model")
-    os.makedirs(output_model_path, exist_ok=True)
-
-    # 가장 최신 모델 파일 찾기
-    g_model_files = [f for f in os.listdir(model_path) if f.startswith("G_") and f.endswith(".pth")]
-    if g_model_files:
-        # 가장 큰 숫자의 모델 파일 선택
-        latest_g_model = sorted(g_model_files, key=lambda x: int(x.split('_')[1].split('.')[0]), reverse=True)[0]
-        shutil.copy(os.path.join(model_path, latest_g_model), os.path.join(output_model_path, "G_latest.pth"))
-    else:
-        # 파일이 없으면 기본 이름으로 시도
-        shutil.copy(os.path.join(model_path, "G_40000.pth"), os.path.join(output_model_path, "G_latest.pth"))
-        
-    shutil.copy(os.path.join(model_path, "config.json"), output_model_path)
-    shutil.copy(os.path.join(model_path, "kmeans.pt"), output_model_path)
-
-    return "학습 완료"
\ No newline at end of file
+    _report(progress, "preprocess", 1 / 4, step="flist_config")
+    _run_script(workspace, "preprocess_flist_config.py", env=env)
+
+    # 4. 특징 추출 (캐시에 없는 샘플만 계산)
+    _report(progress, "preprocess", 2 / 4, step="hubert_f0")
+    _prepare_features(user_id, workspace, sample_hashes)
+
+    # 5. 클러스터링 (기존 코드북이 있으면 새 샘플 특징만 반영)
+    _report(progress, "preprocess", 3 / 4, step="cluster")
+    _train_cluster(user_id, workspace, output_model_path, sample_hashes, previous_state)
+    _report(progress, "preprocess", 1.0)
+
+    # 6. 모델 학습 (샘플이 조금만 추가됐으면 이전 체크포인트에서 이어서)
+    if warm_start is None:
+        warm_start = _can_warm_start(output_model_path, previous_state, sample_hashes)
+    start_epoch = _prepare_checkpoints(workspace, output_model_path, previous_state if warm_start else None)
+    # 동시에 학습하는 다른 사용자와 분산 학습 포트(MASTER_PORT)가 겹치지 않도록 빈 포트 지정
+    _update_train_config(workspace, port=str(_free_port()))
+    logger.info(f"모델 학습 시작: {user_id} ({'이어서 학습, ' + str(start_epoch) + '에폭부터' if warm_start else '처음부터 학습'})")
+
+    last_epoch, last_step = _run_training(workspace, [
+        "python", _script_path("train.py"),
+        "-c", SVC_TRAIN_CONFIG,
+        "-m", MODEL_NAME
+    ], env, progress, start_epoch=start_epoch)
+
+    # 7. 모델 복사 (새 버전 디렉토리에 모두 쓴 뒤 model 링크를 한 번에 전환)
+    _export_model(workspace, output_model_path, {
+        "epoch": last_epoch or _configured_epochs(workspace),
+        "step": last_step,
+        "warm_start": warm_start,
+        "sample_hashes": sorted(set(sample_hashes.values())),
+        "trained_at": time.time()
+    })
+
+    _report(progress, "train", 1.0)
+    return "학습 완료"
+
+def _train_cluster(
+    user_id: str,
+    workspace: Path,
+    model_dir: str,
+    sample_hashes: Dict[str, str],
+    previous_state: Optional[Dict]
+):
+    """train_cluster.py 대신 특징을 파일 단위로 흘려 읽는 미니배치 k-means 로 kmeans.pt 생성
+
+    이전 코드북(배정 수 포함)이 있고 삭제된 샘플이 없으면 새 샘플의 특징만으로 이어서
+    갱신하고, 그렇지 않으면 전체 특징으로 새로 학습합니다.
+    """
+    dataset_dir = workspace / "dataset" / MODEL_NAME / user_id
+    output_path = str(workspace / "logs" / MODEL_NAME / "kmeans.pt")
+    feature_paths = {
+        filename: _soft_feature_path(dataset_dir, filename)
+        for filename in sample_hashes
+    }
+
+    previous_codebook = None
+    if previous_state is not None:
+        previous_codebooks = load_codebooks(os.path.join(model_dir, "kmeans.pt")) or {}
+        previous_codebook = previous_codebooks.get(user_id)
+        previous_hashes = set(previous_state.get("sample_hashes", []))
+        removed = previous_hashes - set(sample_hashes.values())
+        if previous_codebook is None or "counts_" not in previous_codebook or removed:
+            previous_codebook = None
+
+    if previous_codebook is not None:
+        new_paths = [
+            feature_paths[filename] for filename, sample_hash in sample_hashes.items()
+            if sample_hash not in previous_hashes
+        ]
+        if new_paths and load_features(new_paths[0]).shape[1] != previous_codebook["n_features_in_"]:
+            # 음성 인코더가 바뀌어 특징 차원이 다르면 처음부터 학습
+            previous_codebook = None
+        elif not new_paths:
+            logger.info(f"클러스터링: {user_id}, 새 샘플 없음 - 기존 코드북 사용")
+            save_codebooks(output_path, {user_id: previous_codebook})
+            return
+        else:
+            logger.info(f"클러스터링: {user_id}, 새 샘플 {len(new_paths)}개로 기존 코드북 갱신")
+            save_codebooks(output_path, {user_id: fit_codebook(new_paths, init=previous_codebook)})
+            return
+
+    logger.info(f"클러스터링: {user_id}, 샘플 {len(feature_paths)}개로 새 코드북 학습")
+    save_codebooks(output_path, {user_id: fit_codebook(list(feature_paths.values()))})
+
+def _soft_feature_path(dataset_dir: Path, filename: str) -> str:
+    """샘플의 HuBERT 특징 파일 경로 (<stem>.wav.soft.pt)"""
+    path = _produced_features(dataset_dir, filename).get(FEATURE_SUFFIXES[0])
+    if path is None:
+        raise FileNotFoundError(f"특징 파일을 찾을 수 없습니다: {filename}")
+    return path
+
+def _can_warm_start(model_dir: str, state: Optional[Dict], sample_hashes: Dict[str, str]) -> bool:
+    """저장된 G/D 체크포인트가 있고 추가/삭제된 샘플이 적으면 이어서 학습"""
+    if state is None or not state.get("epoch"):
+        return False
+    if not all(os.path.exists(os.path.join(model_dir, name)) for name in ("G_latest.pth", "D_latest.pth")):
+        return False
+
+    previous = set(state.get("sample_hashes", []))
+    current = set(sample_hashes.values())
+    changed = len(current - previous) + len(previous - current)
+    return bool(previous) and changed <= WARM_START_MAX_NEW_SAMPLES
+
+def _prepare_checkpoints(workspace: Path, model_dir: str, state: Optional[Dict]) -> int:
+    """logs/44k 체크포인트 준비 후 학습 시작 에폭 반환
+
+    train.py 는 logs/44k 에서 번호가 가장 큰 G_*.pth / D_*.pth 를 불러와 그 다음 에폭부터
+    config 의 train.epochs 까지 학습합니다. 이어서 학습할 때는 저장된 모델을 그 자리에 두고
+    epochs 를 이전 에폭 + WARM_START_EPOCHS 로 줄여 잡고, 처음부터 학습할 때는 이전 실행의
+    체크포인트를 지우고 공용 사전학습 모델(G_0/D_0)만 둡니다.
+    """
+    log_dir = workspace / "logs" / MODEL_NAME
+    for path in list(log_dir.glob("G_*.pth")) + list(log_dir.glob("D_*.pth")):
+        path.unlink()
+
+    if state is None:
+        shared_log_dir = Path(SVC_DIR) / "logs" / MODEL_NAME
+        for name in ("G_0.pth", "D_0.pth"):
+            if (shared_log_dir / name).exists():
+                link_or_copy(shared_log_dir / name, log_dir / name)
+        return 0
+
+    step = state.get("step") or 1
+    shutil.copy(os.path.join(model_dir, "G_latest.pth"), log_dir / f"G_{step}.pth")
+    shutil.copy(os.path.join(model_dir, "D_latest.pth"), log_dir / f"D_{step}.pth")
+
+    start_epoch = int(state["epoch"])
+    _update_train_config(workspace, epochs=start_epoch + WARM_START_EPOCHS)
+    return start_epoch
+
+def _update_train_config(workspace: Path, **values):
+    """작업 공간 config 의 train 항목 갱신"""
+    config_path = workspace / SVC_TRAIN_CONFIG
+    with open(config_path, "r") as f:
+        config = json.load(f)
+    config["train"].update(values)
+    with open(config_path, "w") as f:
+        json.dump(config, f, indent=2)
+
+def _free_port() -> int:
+    """운영체제가 골라 준 사용 가능한 로컬 포트 번호"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _export_model(workspace: Path, output_model_path: str, state: Dict):
+    """학습 결과를 새 버전 디렉토리로 내보낸 뒤 model 링크를 한 번에 전환
+
+    모든 파일을 user_data/<id>/model_versions/<버전>/ 에 쓴 다음, 그 디렉토리를 가리키는
+    임시 심볼릭 링크를 os.replace 로 model 과 바꿉니다. 링크 교체 한 번으로 전환되므로
+    model/ 아래에는 항상 한 번의 학습 결과가 통째로 보이고, 추론 쪽은 링크를 한 번만 풀어
+    같은 버전의 G/config/kmeans 를 함께 엽니다.
+    """
+    model_path = workspace / "logs" / MODEL_NAME
+    versions_dir = Path(output_model_path).parent / MODEL_VERSIONS_DIR
+    version = str(time.time_ns())
+    version_dir = versions_dir / version
+    version_dir.mkdir(parents=True)
+
+    try:
+        # 가장 최신 모델 파일 찾기
+        g_model_files = [f for f in os.listdir(model_path) if f.startswith("G_") and f.endswith(".pth")]
+        if g_model_files:
+            # 가장 큰 숫자의 모델 파일 선택
+            latest_g_model = sorted(g_model_files, key=lambda x: int(x.split('_')[1].split('.')[0]), reverse=True)[0]
+        else:
+            # 파일이 없으면 기본 이름으로 시도
+            latest_g_model = "G_40000.pth"
+        shutil.copy(model_path / latest_g_model, version_dir / "G_latest.pth")
+        # 로그 마지막 줄이 아니라 실제로 내보낸 체크포인트의 에폭/스텝을 기록해야
+        # 다음 이어서 학습이 이 체크포인트가 끝난 지점부터 에폭을 셈
+        state = {
+            **state,
+            "epoch": _checkpoint_epoch(version_dir / "G_latest.pth") or state["epoch"],
+            "step": int(latest_g_model[2:-len(".pth")])
+        }
+        # 다음 학습을 이어서 할 수 있도록 같은 스텝의 판별자 체크포인트도 보관
+        latest_d_model = "D_" + latest_g_model[2:]
+        if (model_path / latest_d_model).exists():
+            shutil.copy(model_path / latest_d_model, version_dir / "D_latest.pth")
+
+        shutil.copy(model_path / "config.json", version_dir / "config.json")
+        shutil.copy(model_path / "kmeans.pt", version_dir / "kmeans.pt")
+
+        with open(version_dir / TRAIN_STATE_FILE, "w") as f:
+            json.dump(state, f)
+
+        _switch_model_link(output_model_path, os.path.join(MODEL_VERSIONS_DIR, version))
+    except BaseException:
+        shutil.rmtree(version_dir, ignore_errors=True)
+        raise
+
+    _remove_old_versions(versions_dir, keep=version)
+
+def _checkpoint_epoch(path: Path) -> Optional[int]:
+    """so-vits-svc 체크포인트에 저장된 에폭 (save_checkpoint 의 iteration 항목)"""
+    import torch
+
+    checkpoint = torch.load(path, map_location="cpu")
+    epoch = checkpoint.get("iteration")
+    return int(epoch) if epoch is not None else None
+
+def _switch_model_link(output_model_path: str, target: str):
+    """model 을 target (model 기준 상대 경로) 을 가리키는 링크로 원자적으로 교체"""
+    if os.path.isdir(output_model_path) and not os.path.islink(output_model_path):
+        # 가입 시 만든 빈 디렉토리 또는 이전 방식(파일 직접 교체)으로 내보낸 모델
+        if os.listdir(output_model_path):
+            legacy_dir = os.path.join(os.path.dirname(output_model_path), MODEL_VERSIONS_DIR, "legacy")
+            shutil.rmtree(legacy_dir, ignore_errors=True)
+            os.rename(output_model_path, legacy_dir)
+        else:
+            os.rmdir(output_model_path)
+
+    tmp_link = f"{output_model_path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    os.symlink(target, tmp_link, target_is_directory=True)
+    try:
+        os.replace(tmp_link, output_model_path)
+    except BaseException:
+        os.remove(tmp_link)
+        raise
+
+def _remove_old_versions(versions_dir: Path, keep: str):
+    """최근 MODEL_VERSIONS_KEPT 개를 제외한 모델 버전 삭제"""
+    versions = sorted(
+        (path for path in versions_dir.iterdir() if path.is_dir()),
+        key=lambda path: path.stat().st_mtime_ns,
+        reverse=True
+    )
+    for path in versions[MODEL_VERSIONS_KEPT:]:
+        if path.name != keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+def load_train_state(model_dir: str) -> Optional[Dict]:
+    """마지막 학습 상태 (에폭, 스텝, 학습에 쓴 샘플 해시) 반환"""
+    try:
+        with open(os.path.join(model_dir, TRAIN_STATE_FILE), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _prepare_dataset(user_id: str, workspace: Path) -> Dict[str, str]:
+    """dataset/44k/<user_id> 를 리샘플링 캐시에 연결해 새로 구성, {파일명: 샘플 해시} 반환
+
+    샘플 인덱스에 기록된 해시를 그대로 사용하므로 바뀌지 않은 샘플은 다시 읽지 않습니다.
+    삭제된 샘플은 디렉토리를 새로 만들면서 자연스럽게 빠집니다.
+    """
+    cache = get_feature_cache()
+    version = cache.make_version({"step": "resample", "sr": TRAIN_SAMPLE_RATE, "version": RESAMPLE_VERSION})
+    dataset_dir = workspace / "dataset" / MODEL_NAME / user_id
+    shutil.rmtree(dataset_dir, ignore_errors=True)
+    dataset_dir.mkdir(parents=True)
+
+    samples = get_sample_index().entries(Path(BASE_DIR) / user_id / "samples", analyze=False)
+    sample_hashes = {}
+    resampled_count = 0
+    for sample in samples:
+        resampled = cache.resampled(sample["sha256"], version)
+        if resampled is None:
+            tmp_path = dataset_dir / f".{sample['filename']}.tmp"
+            _resample(sample["path"], str(tmp_path))
+            resampled = cache.put_resampled(sample["sha256"], version, str(tmp_path))
+            resampled_count += 1
+        link_or_copy(resampled, dataset_dir / sample["filename"])
+        sample_hashes[sample["filename"]] = sample["sha256"]
+
+    logger.info(f"학습 데이터셋 구성: {user_id}, 샘플 {len(sample_hashes)}개 중 {resampled_count}개 리샘플링")
+    return sample_hashes
+
+def _resample(input_path: str, output_path: str):
+    """so-vits-svc resample.py 와 같은 방식으로 44.1kHz 16bit 모노 WAV 생성"""
+    import librosa
+    import soundfile as sf
+
+    wav, sr = librosa.load(input_path, sr=None)
+    peak = np.abs(wav).max()
+    if peak > 1.0:
+        wav = 0.98 * wav / peak
+    wav = librosa.resample(wav, orig_sr=sr, target_sr=TRAIN_SAMPLE_RATE)
+    wav = wav / max(np.abs(wav).max(), 1e-8)
+    sf.write(output_path, wav, TRAIN_SAMPLE_RATE, subtype="PCM_16", format="WAV")
+
+def _prepare_features(user_id: str, workspace: Path, sample_hashes: Dict[str, str]):
+    """캐시된 특징은 연결하고, 없는 샘플만 모아 preprocess_hubert_f0.py 를 병렬 실행"""
+    cache = get_feature_cache()
+    version = cache.make_version({"step": "features", **_feature_params(workspace)})
+    expected = _expected_feature_suffixes(workspace)
+    dataset_dir = workspace / "dataset" / MODEL_NAME / user_id
+
+    pending: List[str] = []
+    for filename, sample_hash in sample_hashes.items():
+        files = cache.features(sample_hash, version)
+        if files is None or not all(suffix in files for suffix in expected):
+            pending.append(filename)
+            continue
+        _link_features(files, dataset_dir, filename)
+
+    logger.info(f"특징 추출: {user_id}, 샘플 {len(sample_hashes)}개 중 {len(pending)}개 계산")
+    if not pending:
+        return
+
+    # 새 샘플만 담은 임시 데이터셋을 샤드로 나눠 여러 프로세스에서 동시에 추출
+    # (스크립트는 <in_dir>/<화자>/*.wav 를 처리하고 결과를 wav 옆에 씀)
+    pending_root = workspace / "dataset_pending"
+    shutil.rmtree(pending_root, ignore_errors=True)
+    shards = _shard_by_size(pending, dataset_dir, _preprocess_workers(len(pending)))
+    shard_dirs = []
+    for index, shard in enumerate(shards):
+        shard_dir = pending_root / f"shard-{index}" / MODEL_NAME / user_id
+        shard_dir.mkdir(parents=True)
+        for filename in shard:
+            link_or_copy(dataset_dir / filename, shard_dir / filename)
+        shard_dirs.append(shard_dir)
+
+    try:
+        # 워커마다 스레드 수를 고정해 프로세스 수 × torch 기본 스레드 수만큼 과다 할당되지 않도록 함
+        worker_env = _subprocess_env(PREPROCESS_THREADS_PER_WORKER)
+        processes = [
+            subprocess.Popen(
+                ["python", _script_path("preprocess_hubert_f0.py"), "--in_dir", str(shard_dir.parent)],
+                cwd=workspace, env=worker_env
+            )
+            for shard_dir in shard_dirs
+        ]
+        failed = [i for i, process in enumerate(processes) if process.wait() != 0]
+
+        # 정상 종료한 샤드에서 특징이 모두 만들어진 샘플만 캐시에 저장해 다음 실행에서 재사용
+        # (실패한 샤드의 파일은 중간에 멈춘 워커가 남긴 일부일 수 있으므로 저장하지 않음)
+        missing = []
+        for index, (shard, shard_dir) in enumerate(zip(shards, shard_dirs)):
+            if index in failed:
+                continue
+            for filename in shard:
+                produced = _produced_features(shard_dir, filename)
+                if not all(suffix in produced for suffix in expected):
+                    missing.append(filename)
+                    continue
+                produced = {suffix: produced[suffix] for suffix in expected}
+                files = cache.put_features(sample_hashes[filename], version, produced)
+                _link_features(files, dataset_dir, filename)
+
+        if failed or missing:
+            raise RuntimeError(f"특징 추출 실패: 샤드 {failed}, 샘플 {missing}")
+    finally:
+        shutil.rmtree(pending_root, ignore_errors=True)
+
+def _preprocess_workers(pending_count: int) -> int:
+    workers = PREPROCESS_WORKERS or max(1, _job_threads() // max(1, PREPROCESS_THREADS_PER_WORKER))
+    return max(1, min(workers, pending_count))
+
+def _shard_by_size(filenames: List[str], directory: Path, shard_count: int) -> List[List[str]]:
+    """파일 크기(=길이)가 큰 것부터 가장 가벼운 샤드에 배정해 워커별 작업량을 맞춤"""
+    shards: List[List[str]] = [[] for _ in range(shard_count)]
+    loads = [0] * shard_count
+    for filename in sorted(filenames, key=lambda name: (directory / name).stat().st_size, reverse=True):
+        lightest = loads.index(min(loads))
+        shards[lightest].append(filename)
+        loads[lightest] += (directory / filename).stat().st_size
+    return [shard for shard in shards if shard]
+
+def _produced_features(directory: Path, filename: str) -> Dict[str, str]:
+    """<stem>.wav 에서 만들어진 특징 파일 {접미사: 경로}
+
+    와일드카드로 찾으면 a.wav 의 결과에 같은 디렉토리의 a.b.wav 결과가 섞이므로
+    알려진 접미사의 정확한 파일 이름만 확인합니다.
+    """
+    stem = os.path.splitext(filename)[0]
+    produced = {}
+    for suffix in (*FEATURE_SUFFIXES, VOLUME_FEATURE_SUFFIX):
+        path = os.path.join(directory, f"{stem}.{suffix}")
+        if os.path.exists(path):
+            produced[suffix] = path
+    return produced
+
+def _link_features(files: Dict[str, Path], dataset_dir: Path, filename: str):
+    stem = os.path.splitext(filename)[0]
+    for suffix, path in files.items():
+        link_or_copy(path, dataset_dir / f"{stem}.{suffix}")
+
+def _expected_feature_suffixes(workspace: Path) -> Tuple[str, ...]:
+    """샘플 하나에 대해 모두 있어야 하는 특징 파일 접미사 (음량 임베딩을 쓰면 vol 포함)"""
+    try:
+        with open(workspace / SVC_TRAIN_CONFIG, "r") as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        return FEATURE_SUFFIXES
+
+    if config.get("model", {}).get("vol_embedding"):
+        return (*FEATURE_SUFFIXES, VOLUME_FEATURE_SUFFIX)
+    return FEATURE_SUFFIXES
+
+def _feature_params(workspace: Path) -> Dict:
+    """특징 캐시 버전에 반영되는 설정 (인코더, 샘플레이트, hop 길이 등)"""
+    params = {"extractor_version": FEATURE_EXTRACTOR_VERSION}
+    try:
+        with open(workspace / SVC_TRAIN_CONFIG, "r") as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        return params
+
+    data = config.get("data", {})
+    params.update({
+        # 4.0 config 에는 speech_encoder 항목이 없음 (vec256l9 고정)
+        "speech_encoder": config.get("model", {}).get("speech_encoder", "vec256l9"),
+        "sampling_rate": data.get("sampling_rate"),
+        "hop_length": data.get("hop_length"),
+        "filter_length": data.get("filter_length"),
+        "win_length": data.get("win_length")
+    })
+    return params
+
+def _script_path(script: str) -> str:
+    return str(Path(SVC_DIR).resolve() / script)
+
+def _run_script(workspace: Path, script: str, env: Dict[str, str], *args: str):
+    """so-vits-svc 스크립트를 작업 공간을 현재 디렉토리로 하여 실행"""
+    result = subprocess.run(["python", _script_path(script), *args], cwd=workspace, env=env)
+    if result.returncode != 0:
+        raise RuntimeError(f"{script} 실행 실패 (종료 코드 {result.returncode})")
+
+def _job_threads() -> int:
+    """학습 작업 하나에 배정되는 스레드 수 (동시 학습끼리 코어를 나눠 씀)"""
+    return TRAIN_THREADS_PER_JOB or max(1, (os.cpu_count() or 1) // max(1, STAGE_CONCURRENCY["train"]))
+
+def _subprocess_env(threads: Optional[int] = None) -> Dict[str, str]:
+    """하위 프로세스의 torch/BLAS 스레드 수 제한"""
+    threads = threads or _job_threads()
+    env = dict(os.environ)
+    for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        env[name] = str(threads)
+    return env
+
+@contextmanager
+def _user_lock(user_id: str, wait: bool = True):
+    """사용자별 학습 잠금 (flock 이라 스레드와 워커 프로세스 모두에 대해 배타적)
+
+    같은 작업 공간과 model 링크를 두 학습이 동시에 건드리지 않도록 합니다.
+    flock 은 파일을 열 때마다 따로 잡히고 프로세스가 죽으면 저절로 풀립니다.
+    """
+    lock_path = os.path.join(BASE_DIR, user_id, TRAIN_LOCK_FILENAME)
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    with open(lock_path, "a") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise TrainingInProgress(f"이미 학습 중인 사용자입니다: {user_id}")
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _report(progress: Optional[ProgressCallback], stage: str, fraction: Optional[float], **details):
+    if progress:
+        progress(stage, fraction, **details)
+
+def _run_training(
+    workspace: Path,
+    command: list,
+    env: Dict[str, str],
+    progress: Optional[ProgressCallback] = None,
+    start_epoch: int = 0
+) -> Tuple[Optional[int], Optional[int]]:
+    """train.py 실행 - 실행 중 train.log 의 에폭/스텝 로그를 진행 이벤트로 전달, 마지막 (에폭, 스텝) 반환"""
+    log_path = workspace / "logs" / MODEL_NAME / "train.log"
+    total_epochs = _configured_epochs(workspace)
+    # 이전 학습 로그는 건너뛰고 이번 실행에서 추가된 줄만 읽음
+    offset = log_path.stat().st_size if log_path.exists() else 0
+    last = {"epoch": None, "step": None}
+
+    process = subprocess.Popen(command, cwd=workspace, env=env)
+    while True:
+        finished = process.poll() is not None
+        offset = _read_training_log(log_path, offset, start_epoch, total_epochs, last, progress)
+        if finished:
+            break
+        time.sleep(TRAIN_LOG_POLL_SECONDS)
+
+    if process.returncode != 0:
+        raise RuntimeError(f"train.py 실행 실패 (종료 코드 {process.returncode})")
+    return last["epoch"], last["step"]
+
+def _read_training_log(
+    log_path: Path,
+    offset: int,
+    start_epoch: int,
+    total_epochs: Optional[int],
+    last: Dict,
+    progress: Optional[ProgressCallback] = None
+) -> int:
+    if not log_path.exists():
+        return offset
+
+    with open(log_path, "r", encoding="utf-8", errors="ignore") as f:
+        f.seek(offset)
+        lines = f.readlines()
+        offset = f.tell()
+
+    for line in lines:
+        epoch_match = EPOCH_PATTERN.search(line)
+        if epoch_match:
+            epoch, percent = int(epoch_match.group(1)), int(epoch_match.group(2))
+            last["epoch"] = epoch
+            if progress:
+                budget = total_epochs - start_epoch if total_epochs else 0
+                fraction = min(1.0, (epoch - start_epoch - 1 + percent / 100) / budget) if budget > 0 else None
+                progress("train", fraction, epoch=epoch, total_epochs=total_epochs)
+            continue
+
+        step_match = STEP_PATTERN.search(line)
+        if step_match:
+            last["step"] = int(step_match.group(1))
+            if progress:
+                progress("train", None, step=last["step"])
+
+    return offset
+
+def _configured_epochs(workspace: Path) -> Optional[int]:
+    try:
+        with open(workspace / SVC_TRAIN_CONFIG, "r") as f:
+            return int(json.load(f)["train"]["epochs"])
+    except (OSError, KeyError, ValueError):
+        return None
\ No newline at end of file
@@ -3,6 +3,7 @@ import logging
 from pathlib import Path
 from typing import Optional, Dict
 from app.utils.audio_validator import AudioValidator
+from app.services.sample_index import get_sample_index
 import numpy as np
 
 logger = logging.getLogger(__name__)
@@ -16,6 +17,7 @@ class TrainerService:
     def __init__(self, base_dir: str = "user_data"):
         self.base_dir = Path(base_dir)
         self.validator = AudioValidator()
+        self.sample_index = get_sample_index()
         
     def check_training_requirements(self, user_id: str) -> bool:
         """학습 요구사항 확인"""
@@ -24,20 +26,29 @@ class TrainerService:
             if not samples_dir.exists():
                 return False
                 
+            return self._meets_requirements(self._get_indexed_samples(samples_dir))
+            
+        except Exception as e:
+            logger.error(f"학습 요구사항 확인 실패: {str(e)}")
+            return False
+            
+    def _meets_requirements(self, samples: list) -> bool:
+        """인덱스 항목으로 학습 요구사항 확인"""
+        try:
             # 샘플 수 확인
-            samples = list(samples_dir.glob("*.wav"))
             if len(samples) < self.MIN_SAMPLES:
                 logger.warning(f"샘플 수가 부족합니다. 현재: {len(samples)}, 필요: {self.MIN_SAMPLES}")
                 return False
                 
             # 총 음성 길이 확인
-            total_duration = sum(self.validator.get_duration(str(sample)) for sample in samples)
+            durations = [sample["duration"] for sample in samples]
+            total_duration = sum(durations)
             if total_duration < self.MIN_TOTAL_DURATION:
                 logger.warning(f"총 음성 길이가 부족합니다. 현재: {total_duration}초, 필요: {self.MIN_TOTAL_DURATION}초")
                 return False
                 
             # 음성 다양성 확인
-            if not self._has_sufficient_variety(samples):
+            if not self._has_sufficient_variety(durations):
                 logger.warning("음성의 다양성이 부족합니다")
                 return False
                 
@@ -83,12 +94,13 @@ class TrainerService:
                     "total_duration": 0
                 }
                 
-            samples = list(samples_dir.glob("*.wav"))
-            total_duration = sum(self.validator.get_duration(str(sample)) for sample in samples)
+            samples = self._get_indexed_samples(samples_dir)
+            total_duration = sum(sample["duration"] for sample in samples)
+            ready = self._meets_requirements(samples)
             
             return {
-                "status": "ready" if self.check_training_requirements(user_id) else "insufficient",
-                "message": "학습 가능" if self.check_training_requirements(user_id) else "학습 요구사항 미달",
+                "status": "ready" if ready else "insufficient",
+                "message": "학습 가능" if ready else "학습 요구사항 미달",
                 "samples_count": len(samples),
                 "total_duration": total_duration,
                 "requirements": {
@@ -104,11 +116,14 @@ class TrainerService:
                 "message": str(e)
             }
             
-    def _has_sufficient_variety(self, samples: list) -> bool:
+    def _get_indexed_samples(self, samples_dir: Path) -> list:
+        """샘플 인덱스 항목 (인덱스에 없는 샘플은 헤더만 읽어 추가)"""
+        return self.sample_index.entries(samples_dir, analyze=False)
+        
+    def _has_sufficient_variety(self, durations: list) -> bool:
         """음성 다양성 확인"""
         try:
             # 샘플 길이의 표준편차 계산
-            durations = [self.validator.get_duration(str(sample)) for sample in samples]
             std_dev = np.std(durations)
             
             # 표준편차가 충분히 크면 다양성이 있다고 판단
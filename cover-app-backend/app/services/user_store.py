@@ -0,0 +1,171 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+USER_DB_PATH = os.getenv("USER_DB_PATH", "user_data/users.db")
+# 이전 버전의 전체 파일 저장소 (처음 열 때 한 번만 옮긴 뒤 .migrated 로 이름 변경)
+LEGACY_USERS_FILE = "user_data/users.json"
+# 프로세스 안에 보관하는 사용자 레코드 수
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+# 다른 프로세스가 쓰기 잠금을 잡고 있을 때 기다리는 최대 시간 (밀리초)
+USER_DB_BUSY_TIMEOUT_MS = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    username TEXT NOT NULL,
+    email TEXT NOT NULL,
+    password TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email ON users (email);
+"""
+USER_COLUMNS = ("id", "username", "email", "password")
+
+
+class EmailAlreadyExists(ValueError):
+    pass
+
+
+class UserStore:
+    """SQLite(WAL) 기반 사용자 저장소
+
+    이메일에 유니크 인덱스를 두어 조회와 중복 확인이 전체 스캔 없이 이루어지고,
+    가입은 트랜잭션 한 번으로 끝나 동시 요청이 서로의 기록을 덮어쓰지 않습니다.
+    연결은 스레드마다 하나씩 열고, WAL 모드라 여러 워커 프로세스의 읽기가 쓰기를 막지 않습니다.
+
+    조회한 레코드는 프로세스 안의 LRU 캐시에 보관합니다. 사용자 레코드는 생성 후 바뀌지 않으므로
+    다른 프로세스와 캐시를 맞출 필요가 없고, 없는 사용자는 캐시하지 않아 다른 워커에서
+    방금 가입한 사용자도 바로 찾을 수 있습니다.
+    """
+
+    def __init__(self, db_path: str = USER_DB_PATH, cache_size: int = USER_CACHE_SIZE):
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self._local = threading.local()
+        self._cache: "OrderedDict[str, Dict]" = OrderedDict()
+        self._email_ids: Dict[str, str] = {}
+        self._cache_lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+        self._migrate_legacy()
+
+    def get(self, user_id: str) -> Optional[Dict]:
+        with self._cache_lock:
+            user = self._cache.get(user_id)
+            if user is not None:
+                self._cache.move_to_end(user_id)
+                return dict(user)
+
+        row = self._connection().execute(
+            f"SELECT {', '.join(USER_COLUMNS)} FROM users WHERE id = ?", (user_id,)
+        ).fetchone()
+        return self._remember(row)
+
+    def get_by_email(self, email: str) -> Optional[Dict]:
+        with self._cache_lock:
+            user_id = self._email_ids.get(email)
+        if user_id is not None:
+            user = self.get(user_id)
+            if user is not None:
+                return user
+
+        row = self._connection().execute(
+            f"SELECT {', '.join(USER_COLUMNS)} FROM users WHERE email = ?", (email,)
+        ).fetchone()
+        return self._remember(row)
+
+    def create(self, user: Dict) -> Dict:
+        """사용자 추가 (이메일이 이미 있으면 EmailAlreadyExists)"""
+        record = {column: user[column] for column in USER_COLUMNS}
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    f"INSERT INTO users ({', '.join(USER_COLUMNS)}, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (*(record[column] for column in USER_COLUMNS), time.time())
+                )
+        except sqlite3.IntegrityError:
+            raise EmailAlreadyExists(record["email"])
+
+        self._remember(tuple(record[column] for column in USER_COLUMNS))
+        return dict(record)
+
+    def _remember(self, row) -> Optional[Dict]:
+        if row is None:
+            return None
+
+        user = dict(zip(USER_COLUMNS, row))
+        with self._cache_lock:
+            self._cache[user["id"]] = user
+            self._cache.move_to_end(user["id"])
+            self._email_ids[user["email"]] = user["id"]
+            while len(self._cache) > self.cache_size:
+                _, evicted = self._cache.popitem(last=False)
+                self._email_ids.pop(evicted["email"], None)
+        return dict(user)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=USER_DB_BUSY_TIMEOUT_MS / 1000)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={USER_DB_BUSY_TIMEOUT_MS}")
+            self._local.conn = conn
+        return conn
+
+    def _migrate_legacy(self, legacy_file: str = LEGACY_USERS_FILE):
+        """users.json 의 사용자를 한 트랜잭션으로 옮김 (같은 ID/이메일이 이미 있으면 건너뜀)"""
+        if not os.path.exists(legacy_file):
+            return
+
+        try:
+            with open(legacy_file, "r") as f:
+                legacy_users = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"기존 사용자 파일을 읽을 수 없어 이전하지 않습니다: {str(e)}")
+            return
+
+        now = time.time()
+        rows = [
+            (*(user[column] for column in USER_COLUMNS), now)
+            for user in legacy_users.values()
+            if all(column in user for column in USER_COLUMNS)
+        ]
+        with self._connection() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                f"INSERT OR IGNORE INTO users ({', '.join(USER_COLUMNS)}, created_at) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            migrated = conn.total_changes - before
+
+        # 여러 워커가 동시에 시작해도 INSERT OR IGNORE 라 중복 없이 끝나고, 이름 변경은 한 번만 성공
+        try:
+            os.replace(legacy_file, f"{legacy_file}.migrated")
+        except OSError:
+            pass
+        logger.info(f"사용자 {migrated}명을 {legacy_file} 에서 {self.db_path} 로 이전 (전체 {len(legacy_users)}명)")
+
+
+_store: Optional[UserStore] = None
+_store_lock = threading.Lock()
+
+
+def get_user_store() -> UserStore:
+    """프로세스 전역 사용자 저장소 반환"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = UserStore()
+    return _store
@@ -4,7 +4,8 @@ import os
 from typing import List, Optional
 from fastapi import UploadFile
 import logging
-from app.utils.audio_validator import AudioValidator
+from app.utils.audio_validator import AudioValidator, AudioAnalysis
+from app.services.sample_index import get_sample_index
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +23,7 @@ class VoiceSampleService:
     def __init__(self, base_dir: str = "user_data"):
         self.base_dir = Path(base_dir)
         self.validator = AudioValidator()
+        self.sample_index = get_sample_index()
         
     def get_samples_dir(self, user_id: str) -> Path:
         """사용자의 샘플 디렉토리 경로 반환"""
@@ -44,37 +46,46 @@ class VoiceSampleService:
                 shutil.copyfileobj(file.file, buffer)
             
             # 샘플 검증
-            self.validate_sample(str(temp_path))
+            analysis = self.validate_sample(str(temp_path))
             
             # 검증 통과 후 최종 저장
             final_path = samples_dir / file.filename
             temp_path.rename(final_path)
             
+            # 검증 때 계산한 분석 결과를 인덱스에 기록 (목록/학습 상태 조회 시 재분석 없음)
+            self.sample_index.record(str(final_path), analysis)
+            
+            # 새 샘플 수가 AUTO_RETRAIN_THRESHOLD 를 넘으면 자동 재학습 예약
+            from app.services.retrain_scheduler import get_retrain_scheduler
+            get_retrain_scheduler().notify(user_id)
+            
             return str(final_path)
         except Exception as e:
             if temp_path.exists():
                 temp_path.unlink()
             raise e
             
-    def validate_sample(self, sample_path: str):
-        """샘플 품질 검증"""
-        # 기본 오디오 검증
-        self.validator.validate_format(sample_path)
+    def validate_sample(self, sample_path: str) -> AudioAnalysis:
+        """샘플 품질 검증 (한 번 디코딩한 분석 결과를 반환해 재사용)"""
+        # 기본 오디오 검증 (디코딩 실패 시 형식 오류)
+        analysis = self.validator.analyze(sample_path)
         
         # 길이 검증
-        duration = self.validator.get_duration(sample_path)
+        duration = analysis.duration
         if duration < self.MIN_DURATION:
             raise ValueError(f"샘플은 최소 {self.MIN_DURATION}초 이상이어야 합니다")
         if duration > self.MAX_DURATION:
             raise ValueError(f"샘플은 {self.MAX_DURATION}초 이하여야 합니다")
         
         # 품질 검증
-        quality = self.validator.validate_quality(sample_path)
+        quality = self.validator.check_quality(analysis)
         if quality < self.validator.MIN_QUALITY_THRESHOLD:
             raise ValueError("샘플 품질이 기준에 미달합니다")
             
         # 음성 내용 검증
-        self.validator.validate_audio_content(sample_path)
+        self.validator.check_content(analysis)
+        
+        return analysis
         
     def list_samples(self, user_id: str) -> List[dict]:
         """사용자의 모든 샘플 목록 반환"""
@@ -83,19 +94,14 @@ class VoiceSampleService:
             return []
             
         samples = []
-        for file_path in samples_dir.glob("*.wav"):
-            try:
-                duration = self.validator.get_duration(str(file_path))
-                quality = self.validator.validate_quality(str(file_path))
-                samples.append({
-                    "filename": file_path.name,
-                    "path": str(file_path),
-                    "duration": duration,
-                    "quality": quality,
-                    "created_at": file_path.stat().st_mtime
-                })
-            except Exception as e:
-                logger.error(f"샘플 정보 조회 실패: {file_path}, 에러: {str(e)}")
+        for entry in self.sample_index.entries(samples_dir):
+            samples.append({
+                "filename": entry["filename"],
+                "path": entry["path"],
+                "duration": entry["duration"],
+                "quality": entry["quality"],
+                "created_at": entry["mtime"]
+            })
                 
         return sorted(samples, key=lambda x: x["created_at"], reverse=True)
         
@@ -105,6 +111,7 @@ class VoiceSampleService:
             sample_path = Path(sample_id)
             if sample_path.exists():
                 sample_path.unlink()
+                self.sample_index.forget(str(sample_path))
                 return True
             return False
         except Exception as e:
@@ -0,0 +1,93 @@
+import os
+import logging
+from dataclasses import dataclass
+from typing import Optional
+from app.utils.stem_format import is_stem, read_stem_info
+
+logger = logging.getLogger(__name__)
+
+# 헤더의 프레임 수를 그대로 믿을 수 있는 무압축/무손실 컨테이너
+EXACT_FRAME_FORMATS = {"WAV", "WAVEX", "W64", "RF64", "AIFF", "CAF", "FLAC"}
+# PCM 서브타입별 샘플당 바이트 수 (파일 크기로 헤더 검증에 사용)
+PCM_SAMPLE_BYTES = {"PCM_U8": 1, "PCM_S8": 1, "PCM_16": 2, "PCM_24": 3, "PCM_32": 4, "FLOAT": 4, "DOUBLE": 8}
+
+
+@dataclass
+class AudioInfo:
+    """디코딩 없이 얻은 오디오 메타데이터"""
+    duration: float
+    sample_rate: int
+    channels: int
+    source: str  # "header" 또는 "decode"
+
+
+def probe_audio(filepath: str) -> AudioInfo:
+    """컨테이너 헤더에서 길이/샘플레이트/채널 수를 읽음 (헤더를 믿을 수 없을 때만 디코딩)"""
+    if is_stem(filepath):
+        stem = read_stem_info(filepath)
+        return AudioInfo(duration=stem.duration, sample_rate=stem.sample_rate, channels=stem.channels, source="header")
+
+    info = _probe_soundfile(filepath) or _probe_mutagen(filepath)
+    if info is not None:
+        return info
+
+    logger.info(f"헤더 정보를 신뢰할 수 없어 디코딩으로 길이 측정: {filepath}")
+    return _probe_decode(filepath)
+
+
+def _probe_soundfile(filepath: str) -> Optional[AudioInfo]:
+    try:
+        import soundfile as sf
+        info = sf.info(filepath)
+    except Exception:
+        return None
+
+    if info.format not in EXACT_FRAME_FORMATS or info.frames <= 0 or info.samplerate <= 0:
+        return None
+
+    # 스트리밍으로 기록된 WAV 등은 헤더의 프레임 수가 실제 데이터보다 클 수 있음
+    sample_bytes = PCM_SAMPLE_BYTES.get(info.subtype)
+    if sample_bytes and info.frames * info.channels * sample_bytes > os.path.getsize(filepath):
+        return None
+
+    return AudioInfo(
+        duration=info.frames / info.samplerate,
+        sample_rate=info.samplerate,
+        channels=info.channels,
+        source="header"
+    )
+
+
+def _probe_mutagen(filepath: str) -> Optional[AudioInfo]:
+    try:
+        import mutagen
+        audio = mutagen.File(filepath)
+    except Exception:
+        return None
+
+    if audio is None or audio.info is None or not getattr(audio.info, "length", 0):
+        return None
+
+    # Xing/VBRI 헤더가 없는 MP3는 비트레이트로 추정한 길이라 신뢰하지 않음
+    bitrate_mode = getattr(audio.info, "bitrate_mode", None)
+    if bitrate_mode is not None and int(bitrate_mode) == 0:
+        return None
+
+    return AudioInfo(
+        duration=float(audio.info.length),
+        sample_rate=int(getattr(audio.info, "sample_rate", 0)),
+        channels=int(getattr(audio.info, "channels", 0)),
+        source="header"
+    )
+
+
+def _probe_decode(filepath: str) -> AudioInfo:
+    import librosa
+    y, sr = librosa.load(filepath, sr=None, mono=False)
+    channels = 1 if y.ndim == 1 else y.shape[0]
+    return AudioInfo(
+        duration=y.shape[-1] / sr,
+        sample_rate=sr,
+        channels=channels,
+        source="decode"
+    )
@@ -1,31 +1,87 @@
 import librosa
 import numpy as np
+from dataclasses import dataclass
 from typing import List, Tuple
 import logging
+from app.utils.audio_probe import probe_audio
+from app.utils.stem_format import is_stem, read_audio
 
 logger = logging.getLogger(__name__)
 
+@dataclass
+class AudioAnalysis:
+    """한 번의 디코딩으로 계산한 오디오 분석 결과"""
+    filepath: str
+    sample_rate: int
+    num_samples: int
+    duration: float
+    noise_level: float
+    voice_strength: float
+    clarity: float
+    voice_segments: List[Tuple[int, int]]
+
+    @property
+    def quality_score(self) -> float:
+        return (self.voice_strength + self.clarity) / 2
+
 class AudioValidator:
     # 품질 기준
     MIN_QUALITY_THRESHOLD = 0.7
     MAX_NOISE_THRESHOLD = 0.3
     MIN_VOICE_SEGMENTS = 3
     
+    def analyze(self, filepath: str) -> AudioAnalysis:
+        """파일을 한 번만 디코딩해 형식, 길이, 노이즈, RMS, 스펙트럼 대비, 음성 구간을 계산"""
+        try:
+            y, sr = self._load(filepath)
+        except Exception as e:
+            logger.error(f"오디오 형식 검증 실패: {filepath}, 에러: {str(e)}")
+            raise ValueError("지원하지 않는 오디오 형식입니다")
+            
+        try:
+            # 음성 구간은 노이즈 계산과 내용 검증에서 함께 사용
+            voice_segments = self._detect_voice_segments(y, sr)
+            return AudioAnalysis(
+                filepath=filepath,
+                sample_rate=sr,
+                num_samples=len(y),
+                duration=librosa.get_duration(y=y, sr=sr),
+                noise_level=self._noise_level_from_segments(y, voice_segments),
+                voice_strength=self._calculate_voice_strength(y),
+                clarity=self._calculate_clarity(y, sr),
+                voice_segments=voice_segments
+            )
+        except Exception as e:
+            logger.error(f"오디오 분석 실패: {filepath}, 에러: {str(e)}")
+            raise ValueError("오디오를 분석할 수 없습니다")
+            
+    def check_quality(self, analysis: AudioAnalysis) -> float:
+        """분석 결과로 품질 검증 및 점수 반환 (0-1)"""
+        if analysis.noise_level > self.MAX_NOISE_THRESHOLD:
+            raise ValueError("노이즈 레벨이 너무 높습니다")
+        return analysis.quality_score
+        
+    def check_content(self, analysis: AudioAnalysis):
+        """분석 결과로 오디오 내용 검증"""
+        if len(analysis.voice_segments) < self.MIN_VOICE_SEGMENTS:
+            raise ValueError("충분한 음성 구간이 없습니다")
+        if not self._has_sufficient_variety(analysis.voice_segments):
+            raise ValueError("음성의 다양성이 부족합니다")
+            
     def validate_format(self, filepath: str) -> bool:
         """오디오 파일 형식 검증"""
         try:
             # librosa로 파일 로드 시도
-            y, sr = librosa.load(filepath, sr=None)
+            y, sr = self._load(filepath)
             return True
         except Exception as e:
             logger.error(f"오디오 형식 검증 실패: {filepath}, 에러: {str(e)}")
             raise ValueError("지원하지 않는 오디오 형식입니다")
             
     def get_duration(self, filepath: str) -> float:
-        """오디오 파일 길이 반환 (초)"""
+        """오디오 파일 길이 반환 (초) - 가능하면 헤더만 읽음"""
         try:
-            y, sr = librosa.load(filepath, sr=None)
-            return librosa.get_duration(y=y, sr=sr)
+            return probe_audio(filepath).duration
         except Exception as e:
             logger.error(f"오디오 길이 측정 실패: {filepath}, 에러: {str(e)}")
             raise ValueError("오디오 길이를 측정할 수 없습니다")
@@ -33,7 +89,7 @@ class AudioValidator:
     def validate_quality(self, filepath: str) -> float:
         """오디오 품질 검증 및 점수 반환 (0-1)"""
         try:
-            y, sr = librosa.load(filepath, sr=None)
+            y, sr = self._load(filepath)
             
             # 노이즈 레벨 계산
             noise_level = self._calculate_noise_level(y)
@@ -57,7 +113,7 @@ class AudioValidator:
     def validate_audio_content(self, filepath: str):
         """오디오 내용 검증"""
         try:
-            y, sr = librosa.load(filepath, sr=None)
+            y, sr = self._load(filepath)
             
             # 음성 구간 검출
             voice_segments = self._detect_voice_segments(y, sr)
@@ -72,10 +128,20 @@ class AudioValidator:
             logger.error(f"오디오 내용 검증 실패: {filepath}, 에러: {str(e)}")
             raise ValueError("오디오 내용을 검증할 수 없습니다")
             
+    def _load(self, filepath: str) -> Tuple[np.ndarray, int]:
+        """모노 신호와 샘플레이트 반환 (스템은 디코딩 없이 memmap 으로 읽음)"""
+        if is_stem(filepath):
+            return read_audio(filepath, mono=True)
+        return librosa.load(filepath, sr=None)
+        
     def _calculate_noise_level(self, y: np.ndarray) -> float:
         """노이즈 레벨 계산"""
         # 음성 구간 외의 부분을 노이즈로 간주
         voice_segments = self._detect_voice_segments(y, sr=22050)
+        return self._noise_level_from_segments(y, voice_segments)
+        
+    def _noise_level_from_segments(self, y: np.ndarray, voice_segments: List[Tuple[int, int]]) -> float:
+        """이미 검출한 음성 구간으로 노이즈 레벨 계산"""
         noise_segments = self._get_noise_segments(voice_segments, len(y))
         
         if not noise_segments:
@@ -0,0 +1,13 @@
+import hashlib
+
+# 해시 계산 시 한 번에 읽는 크기
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(filepath: str, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """파일 내용의 SHA-256 해시 반환 (청크 단위로 읽어 메모리 사용량 일정)"""
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
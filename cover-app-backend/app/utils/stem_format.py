@@ -0,0 +1,146 @@
+import os
+import json
+import uuid
+import subprocess
+from dataclasses import dataclass
+from typing import Tuple
+import numpy as np
+
+# 내부 중간 결과(분리 스템, 변환 보컬) 전용 형식
+#   [0, HEADER_SIZE)  : 매직 + JSON 헤더 (샘플레이트, 채널 수, 프레임 수, 원본 해시), 0으로 채움
+#   [HEADER_SIZE, ...): 리틀엔디언 float32 프레임 (채널 인터리브)
+# 헤더를 페이지 크기로 고정해 데이터 영역을 그대로 numpy.memmap 으로 열 수 있음
+STEM_EXTENSION = ".f32stem"
+STEM_MAGIC = b"F32STEM1"
+HEADER_SIZE = 4096
+STEM_DTYPE = np.dtype("<f4")
+
+# API 경계에서 내보낼 때의 ffmpeg 인코더 옵션
+EXPORT_FORMATS = {
+    "wav": ["-c:a", "pcm_s16le"],
+    "mp3": ["-c:a", "libmp3lame", "-b:a", "192k"],
+}
+
+
+@dataclass
+class StemInfo:
+    """스템 파일 헤더"""
+    sample_rate: int
+    channels: int
+    frames: int
+    source_hash: str = ""
+
+    @property
+    def duration(self) -> float:
+        return self.frames / self.sample_rate if self.sample_rate else 0.0
+
+
+def is_stem(path: str) -> bool:
+    return str(path).endswith(STEM_EXTENSION)
+
+
+def read_stem_info(path: str) -> StemInfo:
+    """헤더만 읽어 스템 정보 반환"""
+    with open(path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE or not header.startswith(STEM_MAGIC):
+        raise ValueError(f"스템 파일 형식이 아닙니다: {path}")
+
+    meta = json.loads(header[len(STEM_MAGIC):].rstrip(b"\0").decode("utf-8"))
+    info = StemInfo(
+        sample_rate=int(meta["sample_rate"]),
+        channels=int(meta["channels"]),
+        frames=int(meta["frames"]),
+        source_hash=meta.get("source_hash", "")
+    )
+    if HEADER_SIZE + info.frames * info.channels * STEM_DTYPE.itemsize > os.path.getsize(path):
+        raise ValueError(f"스템 파일이 손상되었습니다 (데이터 부족): {path}")
+    return info
+
+
+def open_stem(path: str) -> Tuple[np.ndarray, StemInfo]:
+    """스템을 읽기 전용 memmap (프레임, 채널) 으로 열기 (디코딩/복사 없음, 슬라이스한 구간만 읽힘)"""
+    info = read_stem_info(path)
+    if info.frames == 0:
+        return np.zeros((0, info.channels), dtype=np.float32), info
+
+    audio = np.memmap(path, dtype=STEM_DTYPE, mode="r", offset=HEADER_SIZE, shape=(info.frames, info.channels))
+    return audio, info
+
+
+def write_stem(path: str, audio: np.ndarray, sample_rate: int, source_hash: str = "") -> str:
+    """(프레임,) 또는 (프레임, 채널) 배열을 스템으로 저장 (임시 파일에 쓴 뒤 교체)"""
+    if audio.ndim == 1:
+        audio = audio[:, None]
+
+    meta = {
+        "sample_rate": int(sample_rate),
+        "channels": int(audio.shape[1]),
+        "frames": int(audio.shape[0]),
+        "source_hash": source_hash
+    }
+    header = STEM_MAGIC + json.dumps(meta).encode("utf-8")
+    if len(header) > HEADER_SIZE:
+        raise ValueError("스템 헤더가 너무 큽니다")
+
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(header.ljust(HEADER_SIZE, b"\0"))
+            np.ascontiguousarray(audio, dtype=STEM_DTYPE).tofile(f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+def read_audio(path: str, mono: bool = False) -> Tuple[np.ndarray, int]:
+    """스템은 memmap 으로, 그 외 형식은 soundfile 로 디코딩해 ((프레임, 채널) 또는 모노 배열, 샘플레이트) 반환"""
+    if is_stem(path):
+        audio, info = open_stem(path)
+        sample_rate = info.sample_rate
+    else:
+        import soundfile as sf
+        audio, sample_rate = sf.read(path, dtype="float32", always_2d=True)
+
+    if mono:
+        audio = audio[:, 0] if audio.shape[1] == 1 else audio.mean(axis=1, dtype=np.float32)
+    return audio, sample_rate
+
+
+def export_wav(path: str) -> str:
+    """스템 옆에 같은 이름의 WAV 를 한 번만 만들어 경로 반환 (스템이 아니면 그대로 반환)
+
+    분리/변환 API 는 이전과 같이 WAV 경로를 돌려주므로 응답 직전에 이 함수로 내보냅니다.
+    """
+    if not is_stem(path):
+        return path
+
+    wav_path = os.path.splitext(path)[0] + ".wav"
+    if not os.path.exists(wav_path):
+        export_stem(path, wav_path, "wav")
+    return wav_path
+
+
+def export_stem(path: str, output_path: str, output_format: str = "wav") -> str:
+    """스템을 WAV/MP3 로 내보냄 (API 응답용, ffmpeg 가 헤더를 건너뛰고 원시 PCM 으로 읽음)"""
+    if output_format not in EXPORT_FORMATS:
+        raise ValueError(f"지원하지 않는 내보내기 형식입니다: {output_format}")
+
+    info = read_stem_info(path)
+    tmp_path = f"{output_path}.{uuid.uuid4().hex[:8]}.tmp"
+    result = subprocess.run([
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-f", "f32le", "-ar", str(info.sample_rate), "-ac", str(info.channels),
+        "-skip_initial_bytes", str(HEADER_SIZE), "-i", path,
+        *EXPORT_FORMATS[output_format], "-f", output_format, tmp_path
+    ], capture_output=True, text=True)
+
+    if result.returncode != 0:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise RuntimeError(f"스템 내보내기 실패: {result.stderr}")
+
+    os.replace(tmp_path, output_path)
+    return output_path
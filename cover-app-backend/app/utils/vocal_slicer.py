@@ -0,0 +1,84 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import List
+
+
+@dataclass
+class VocalSlice:
+    """변환할 유성 구간 하나 (샘플 단위, 앞뒤 페이드 길이 포함)"""
+    start: int
+    end: int
+    fade_in: int
+    fade_out: int
+
+
+def find_voiced_slices(
+    y: np.ndarray,
+    sr: int,
+    top_db: float = 40,
+    min_silence: float = 0.3,
+    pad: float = 0.1,
+    max_slice: float = 30.0,
+    overlap: float = 0.5
+) -> List[VocalSlice]:
+    """무음 경계에서 유성 구간을 찾아 변환 단위로 나눔
+
+    AudioValidator._detect_voice_segments 와 같은 librosa.effects.split 기반 VAD를 사용합니다.
+    min_silence 보다 짧은 무음은 이어 붙이고, 각 구간 앞뒤로 pad 만큼 여유를 두어
+    무음 위에서 페이드되도록 합니다. max_slice 보다 긴 구간은 overlap 만큼 겹치게 나눠
+    겹친 부분을 크로스페이드합니다.
+    """
+    import librosa
+
+    intervals = librosa.effects.split(y, top_db=top_db)
+    if len(intervals) == 0:
+        return []
+
+    pad_samples = int(pad * sr)
+    # 앞뒤 여유 구간끼리 겹치지 않도록 최소 무음 길이 보장
+    merge_gap = max(int(min_silence * sr), 2 * pad_samples)
+
+    merged = [[int(intervals[0][0]), int(intervals[0][1])]]
+    for start, end in intervals[1:]:
+        if start - merged[-1][1] < merge_gap:
+            merged[-1][1] = int(end)
+        else:
+            merged.append([int(start), int(end)])
+
+    max_samples = int(max_slice * sr)
+    overlap_samples = min(int(overlap * sr), max_samples // 2)
+
+    slices = []
+    for start, end in merged:
+        padded_start = max(0, start - pad_samples)
+        padded_end = min(len(y), end + pad_samples)
+        head_fade = start - padded_start
+        tail_fade = padded_end - end
+
+        # 긴 구간은 겹치는 조각으로 분할 (마지막 조각이 두 페이드를 모두 담을 만큼 길게 남김)
+        piece_start = padded_start
+        fade_in = head_fade
+        while padded_end - piece_start > max_samples + tail_fade:
+            piece_end = piece_start + max_samples
+            slices.append(VocalSlice(piece_start, piece_end, fade_in, overlap_samples))
+            piece_start = piece_end - overlap_samples
+            fade_in = overlap_samples
+        slices.append(VocalSlice(piece_start, padded_end, fade_in, tail_fade))
+
+    return slices
+
+
+def overlap_add(output: np.ndarray, piece: np.ndarray, vocal_slice: VocalSlice):
+    """변환된 조각을 선형 페이드 후 출력 버퍼에 더함 (겹친 구간은 크로스페이드)"""
+    length = vocal_slice.end - vocal_slice.start
+    # 변환 결과 길이가 입력과 약간 다를 수 있으므로 맞춤
+    if len(piece) < length:
+        piece = np.pad(piece, (0, length - len(piece)))
+    piece = piece[:length].astype(np.float32, copy=True)
+
+    if vocal_slice.fade_in > 0:
+        piece[:vocal_slice.fade_in] *= np.linspace(0.0, 1.0, vocal_slice.fade_in, endpoint=False, dtype=np.float32)
+    if vocal_slice.fade_out > 0:
+        piece[length - vocal_slice.fade_out:] *= np.linspace(1.0, 0.0, vocal_slice.fade_out, endpoint=False, dtype=np.float32)
+
+    output[vocal_slice.start:vocal_slice.end] += piece